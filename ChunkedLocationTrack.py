@@ -0,0 +1,158 @@
+import bisect
+
+import numpy as np
+
+from LocationSensor import LocationSample
+from LocationTrack import LocationTrack
+
+DEFAULT_CHUNK_SIZE = 1024
+
+
+class ChunkedLocationTrack:
+    def __init__(self, chunks: tuple[LocationTrack, ...] = (), chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """An immutable snapshot of a growing track, stored as a sequence of LocationTrack chunks.
+
+        Every chunk after the first starts with a copy of the previous chunk's last row, so the
+        segment across a chunk boundary can be modeled from a single chunk. Appending returns a
+        new snapshot that shares every full chunk with this one and only copies the last, partly
+        filled chunk. This lets a writer publish new snapshots by swapping a single reference
+        while readers keep querying the one they already hold, without any locking.
+
+        :param chunks: Chunks of the track in time order, overlapping by one row.
+        :param chunk_size: Number of rows at which the last chunk is sealed and a new one started.
+        """
+        if chunk_size < 2:
+            raise ValueError('Chunks must hold at least two rows.')
+        self.chunks = tuple(chunks)
+        self.chunk_size = chunk_size
+        self.chunk_starts = [chunk.min_timestamp for chunk in self.chunks]
+
+    @classmethod
+    def from_samples(cls, samples: list[LocationSample | None], chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'ChunkedLocationTrack':
+        return cls(chunk_size=chunk_size).appended(samples)
+
+    @classmethod
+    def from_track(cls, track: LocationTrack, chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'ChunkedLocationTrack':
+        """Splits an existing track into chunks."""
+        if not len(track):
+            return cls(chunk_size=chunk_size)
+
+        chunks = []
+        start = 0
+        while True:
+            end = min(start + chunk_size, len(track))
+            chunks.append(LocationTrack(track.time_utc_seconds[start:end], track.lat_degrees[start:end],
+                                        track.lon_degrees[start:end], track.alt_meters[start:end],
+                                        track.gap_after[start:end]))
+            if end == len(track):
+                return cls(tuple(chunks), chunk_size)
+            start = end - 1
+
+    def appended(self, samples: list[LocationSample | None]) -> 'ChunkedLocationTrack':
+        """Returns a new snapshot with samples appended, where None marks an invalid reading.
+
+        Samples must not be older than the last sample already in the track.
+        """
+        sealed = list(self.chunks[:-1])
+        tail = self.chunks[-1] if self.chunks else LocationTrack.empty()
+        times = tail.time_utc_seconds.tolist()
+        lats = tail.lat_degrees.tolist()
+        lons = tail.lon_degrees.tolist()
+        alts = tail.alt_meters.tolist()
+        gaps = tail.gap_after.tolist()
+
+        for sample in samples:
+            if sample is None:
+                if gaps:
+                    gaps[-1] = True
+                continue
+            if len(times) == self.chunk_size:
+                sealed.append(LocationTrack(times, lats, lons, alts, gaps))
+                times, lats, lons, alts, gaps = times[-1:], lats[-1:], lons[-1:], alts[-1:], gaps[-1:]
+            times.append(sample.time_utc_seconds)
+            lats.append(sample.lat_degrees)
+            lons.append(sample.lon_degrees)
+            alts.append(sample.alt_meters)
+            gaps.append(False)
+
+        if times:
+            sealed.append(LocationTrack(times, lats, lons, alts, gaps))
+        return ChunkedLocationTrack(tuple(sealed), self.chunk_size)
+
+    def to_track(self) -> LocationTrack:
+        """Returns the whole snapshot as a single contiguous LocationTrack."""
+        if len(self.chunks) <= 1:
+            return self.chunks[0] if self.chunks else LocationTrack.empty()
+        parts = [self.chunks[0]] + [LocationTrack(chunk.time_utc_seconds[1:], chunk.lat_degrees[1:],
+                                                  chunk.lon_degrees[1:], chunk.alt_meters[1:],
+                                                  chunk.gap_after[1:]) for chunk in self.chunks[1:]]
+        return LocationTrack.concatenate(parts)
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks) - max(len(self.chunks) - 1, 0)
+
+    @property
+    def min_timestamp(self) -> float:
+        return self.chunks[0].min_timestamp if self.chunks else np.inf
+
+    @property
+    def max_timestamp(self) -> float:
+        return self.chunks[-1].max_timestamp if self.chunks else -np.inf
+
+    def chunk(self, index: int) -> LocationTrack:
+        return self.chunks[index]
+
+    def chunk_for(self, timestamp: float) -> LocationTrack:
+        """Returns the chunk holding the samples used to model timestamp."""
+        index = bisect.bisect_right(self.chunk_starts, timestamp) - 1
+        return self.chunks[max(index, 0)]
+
+    def get_nearest_sample(self, timestamp: float) -> LocationSample | None:
+        if not self.chunks:
+            return None
+        return self.chunk_for(timestamp).get_nearest_sample(timestamp)
+
+    def get_estimated_sample(self, timestamp: float) -> LocationSample | None:
+        if not self.chunks:
+            return None
+        return self.chunk_for(timestamp).get_estimated_sample(timestamp)
+
+    def get_true_course_degrees(self, timestamp: float) -> float | None:
+        if not self.chunks:
+            return None
+        return self.chunk_for(timestamp).get_true_course_degrees(timestamp)
+
+    def get_estimated_positions(self, timestamps) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized get_estimated_sample, see LocationTrack.get_estimated_positions."""
+        return get_estimated_positions_by_chunk(self.chunk_starts, self.chunk, timestamps)
+
+
+def get_estimated_positions_by_chunk(chunk_starts: list[float], chunk,
+                                     timestamps) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized get_estimated_sample over a track stored as chunks overlapping by one row.
+
+    Queries are grouped by chunk with at most one sort, and each chunk answers its group in a
+    single call, so the cost is O(q log q) for q queries however many chunks there are. Queries
+    already in time order, as from a replay, are grouped by slicing without sorting.
+
+    :param chunk_starts: First timestamp of each chunk.
+    :param chunk: Returns the chunk at an index, which must provide get_estimated_positions.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if len(chunk_starts) == 1:
+        return chunk(0).get_estimated_positions(timestamps)
+    queries = timestamps.ravel()
+    lat = np.full(queries.shape, np.nan)
+    lon = np.full(queries.shape, np.nan)
+    alt = np.full(queries.shape, np.nan)
+    if chunk_starts and len(queries):
+        chunk_indices = np.maximum(np.searchsorted(chunk_starts, queries, side='right') - 1, 0)
+        in_order = bool(np.all(chunk_indices[:-1] <= chunk_indices[1:]))
+        order = None if in_order else np.argsort(chunk_indices, kind='stable')
+        sorted_indices = chunk_indices if in_order else chunk_indices[order]
+        group_starts = [0] + (np.flatnonzero(np.diff(sorted_indices)) + 1).tolist() + [len(queries)]
+        for start, end in zip(group_starts, group_starts[1:]):
+            rows = slice(start, end) if in_order else order[start:end]
+            positions = chunk(int(sorted_indices[start])).get_estimated_positions(queries[rows])
+            lat[rows], lon[rows], alt[rows] = positions
+    return lat.reshape(timestamps.shape), lon.reshape(timestamps.shape), alt.reshape(timestamps.shape)
@@ -0,0 +1,225 @@
+import bisect
+
+import numpy as np
+
+from LocationSensor import LocationSample
+from LocationTrack import LocationTrack
+from ChunkedLocationTrack import get_estimated_positions_by_chunk
+
+DEFAULT_CHUNK_SIZE = 4096
+_MAX_TICKS = np.iinfo(np.int32).max
+
+
+class CompactChunk:
+    def __init__(self, track: LocationTrack, time_ticks_per_second: int = 1_000_000):
+        """Rows of a track stored as 32 bit offsets from a float64 reference time and position.
+
+        Every column is stored relative to the middle of the chunk's range in it: times as int32
+        ticks, and coordinates as float32, so every offset is at most half that range. A chunk
+        spanning more ticks than an int32 holds (only possible for a single segment across a long
+        outage) falls back to a coarser tick. The first and last times are also
+        kept exactly, so that chunk lookups agree with the float64 track.
+        """
+        self.min_timestamp = track.min_timestamp
+        self.max_timestamp = track.max_timestamp
+        self.epoch_seconds = _middle(track.time_utc_seconds)
+        span = self.max_timestamp - self.min_timestamp if len(track) else 0.0
+        self.seconds_per_tick = max(1.0 / time_ticks_per_second, span / (2 * _MAX_TICKS))
+        self.reference = (_middle(track.lat_degrees), _middle(track.lon_degrees), _middle(track.alt_meters))
+        self.time_ticks = self.ticks_for(track.time_utc_seconds)
+        self.time_ticks.flags.writeable = False
+        self.lat_offsets = _offsets(track.lat_degrees, self.reference[0])
+        self.lon_offsets = _offsets(track.lon_degrees, self.reference[1])
+        self.alt_offsets = _offsets(track.alt_meters, self.reference[2])
+        self.gap_after = track.gap_after
+
+    def __len__(self) -> int:
+        return len(self.time_ticks)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.time_ticks.nbytes + self.lat_offsets.nbytes + self.lon_offsets.nbytes + self.alt_offsets.nbytes
+                + self.gap_after.nbytes + 7 * 8)
+
+    def rows(self, start: int, end: int) -> LocationTrack:
+        """Decodes rows [start, end) into a float64 LocationTrack."""
+        return LocationTrack(self.epoch_seconds + self.time_ticks[start:end] * self.seconds_per_tick,
+                             self.reference[0] + self.lat_offsets[start:end].astype(np.float64),
+                             self.reference[1] + self.lon_offsets[start:end].astype(np.float64),
+                             self.reference[2] + self.alt_offsets[start:end].astype(np.float64),
+                             self.gap_after[start:end])
+
+    def ticks_for(self, timestamps) -> np.ndarray:
+        """Converts timestamps to ticks rounded exactly like the stored ones, so searching them
+        keeps the same order as searching the original float64 times.
+        """
+        ticks = np.round((np.asarray(timestamps, dtype=np.float64) - self.epoch_seconds) / self.seconds_per_tick)
+        return np.clip(ticks, -_MAX_TICKS, _MAX_TICKS).astype(np.int32)
+
+    def segment_index(self, timestamp: float) -> int:
+        """See LocationTrack.segment_index. The chunk must contain at least two rows."""
+        index = int(np.searchsorted(self.time_ticks, self.ticks_for(timestamp), side='right')) - 1
+        return min(max(index, 0), len(self) - 2)
+
+    def sample(self, index: int) -> LocationSample:
+        """Returns row index of the chunk as a LocationSample."""
+        return self.rows(index, index + 1).sample(0)
+
+    def get_nearest_sample(self, timestamp: float) -> LocationSample | None:
+        if len(self) < 2:
+            return self.sample(0) if len(self) else None
+        index = self.segment_index(timestamp)
+        return self.rows(index, index + 2).get_nearest_sample(timestamp)
+
+    def get_estimated_sample(self, timestamp: float, index: int | None = None) -> LocationSample | None:
+        """See LocationTrack.get_estimated_sample, which this runs on just the rows of the segment.
+
+        :param index: Optional segment index for timestamp, if the caller has already located it.
+        """
+        if len(self) < 2:
+            return None
+        if index is None:
+            index = self.segment_index(timestamp)
+        return self.rows(index, index + 2).get_estimated_sample(timestamp, 0)
+
+    def get_true_course_degrees(self, timestamp: float, index: int | None = None) -> float | None:
+        """See LocationTrack.get_true_course_degrees.
+
+        :param index: Optional segment index for timestamp, if the caller has already located it.
+        """
+        if len(self) < 2:
+            return None
+        if index is None:
+            index = self.segment_index(timestamp)
+        # Within a two row slice the gap check only applies inside the segment, which is where
+        # segment_index places every timestamp between the track's first and last samples.
+        return self.rows(index, index + 2).get_true_course_degrees(timestamp, 0)
+
+    def get_estimated_positions(self, timestamps: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """See LocationTrack.get_estimated_positions. Only the rows each query touches are widened
+        to float64, so the scan reads half the memory of a float64 track.
+        """
+        if len(self) < 2:
+            nan = np.full(timestamps.shape, np.nan)
+            return nan, nan.copy(), nan.copy()
+
+        index = np.clip(np.searchsorted(self.time_ticks, self.ticks_for(timestamps), side='right') - 1,
+                        0, len(self) - 2)
+        offsets = (timestamps - self.epoch_seconds) / self.seconds_per_tick
+        left_time = self.time_ticks[index].astype(np.float64)
+        right_time = self.time_ticks[index + 1].astype(np.float64)
+        delta_time = right_time - left_time
+        percent = np.divide(offsets - left_time, delta_time, out=np.zeros(timestamps.shape), where=delta_time > 0)
+
+        columns = []
+        for column, reference in zip((self.lat_offsets, self.lon_offsets, self.alt_offsets), self.reference):
+            left = column[index].astype(np.float64)
+            columns.append(reference + left + percent * (column[index + 1] - left))
+
+        invalid = self.gap_after[index] & (offsets > left_time) & (offsets < right_time)
+        for column in columns:
+            column[invalid] = np.nan
+        return tuple(columns)
+
+
+class CompactLocationTrack:
+    def __init__(self, chunks: list[CompactChunk]):
+        """A read-only track stored at reduced precision, using about half the memory of a LocationTrack.
+
+        Each chunk stores its rows as 32 bit offsets from a float64 reference time and position,
+        so the float64 values only have to be paid for once per chunk: int32 ticks for time and
+        float32 for latitude, longitude and altitude. Like ChunkedLocationTrack, every chunk after
+        the first repeats the previous chunk's last row, so each query reads exactly one chunk.
+        Queries widen just the rows they need and do their arithmetic in float64.
+
+        Error bounds:
+        - Times are within half a tick (0.5 microseconds by default). Chunks are cut short rather
+          than span more ticks than an int32 holds (about 71 minutes by default), except for a
+          single segment across a longer outage, which gets a coarser tick.
+        - Coordinates are within |offset| * 2**-24 of the original, where the offset is at most
+          half the chunk's range in that column. For a chunk spanning 0.1 degrees and 1000 meters
+          that is 3e-9 degrees (0.3 millimeters) and 0.03 millimeters.
+        - Interpolated positions add at most speed * time error to the coordinate error, and a
+          course over a segment of length d degrees is off by at most about 2 * 57.3 * error / d
+          degrees. Use a smaller chunk_size to tighten the bounds for tracks that cover a lot of
+          ground quickly.
+
+        Use CompactLocationTrack.from_track to create one.
+
+        :param chunks: Encoded chunks, in time order, overlapping by one row.
+        """
+        self.chunks = list(chunks)
+        self.chunk_starts = [chunk.min_timestamp for chunk in self.chunks]
+
+    @classmethod
+    def from_track(cls, track, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   time_ticks_per_second: int = 1_000_000) -> 'CompactLocationTrack':
+        """Stores any track (LocationTrack, ChunkedLocationTrack, ...) at reduced precision."""
+        if chunk_size < 2:
+            raise ValueError('Chunks must hold at least two rows.')
+        track = track.to_track()
+        times = track.time_utc_seconds
+        max_span = 2 * _MAX_TICKS / time_ticks_per_second
+        chunks = []
+        start = 0
+        while start < len(track):
+            end = min(start + chunk_size, len(track))
+            end = max(min(end, int(np.searchsorted(times, times[start] + max_span, side='right'))), start + 2)
+            end = min(end, len(track))
+            chunks.append(CompactChunk(track.slice(start, end), time_ticks_per_second))
+            if end == len(track):
+                break
+            start = end - 1
+        return cls(chunks)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(chunk.nbytes for chunk in self.chunks)
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks) - max(len(self.chunks) - 1, 0)
+
+    @property
+    def min_timestamp(self) -> float:
+        return self.chunk_starts[0] if self.chunks else np.inf
+
+    @property
+    def max_timestamp(self) -> float:
+        return self.chunks[-1].max_timestamp if self.chunks else -np.inf
+
+    def to_track(self) -> LocationTrack:
+        """Decodes the whole track into a single float64 LocationTrack."""
+        if not self.chunks:
+            return LocationTrack.empty()
+        return LocationTrack.concatenate([self.chunks[0].rows(0, None)]
+                                         + [chunk.rows(1, None) for chunk in self.chunks[1:]])
+
+    def chunk_for(self, timestamp: float) -> CompactChunk:
+        """Returns the chunk holding the samples used to model timestamp."""
+        return self.chunks[max(bisect.bisect_right(self.chunk_starts, timestamp) - 1, 0)]
+
+    def chunk(self, index: int) -> CompactChunk:
+        return self.chunks[index]
+
+    def get_nearest_sample(self, timestamp: float) -> LocationSample | None:
+        return self.chunk_for(timestamp).get_nearest_sample(timestamp) if self.chunks else None
+
+    def get_estimated_sample(self, timestamp: float) -> LocationSample | None:
+        return self.chunk_for(timestamp).get_estimated_sample(timestamp) if self.chunks else None
+
+    def get_true_course_degrees(self, timestamp: float) -> float | None:
+        return self.chunk_for(timestamp).get_true_course_degrees(timestamp) if self.chunks else None
+
+    def get_estimated_positions(self, timestamps) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized get_estimated_sample, see LocationTrack.get_estimated_positions."""
+        return get_estimated_positions_by_chunk(self.chunk_starts, self.chunk, timestamps)
+
+
+def _middle(values: np.ndarray) -> float:
+    return 0.5 * (float(values.min()) + float(values.max())) if len(values) else 0.0
+
+
+def _offsets(values: np.ndarray, reference: float) -> np.ndarray:
+    offsets = (values - reference).astype(np.float32)
+    offsets.flags.writeable = False
+    return offsets
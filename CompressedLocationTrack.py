@@ -0,0 +1,224 @@
+import bisect
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from LocationSensor import LocationSample
+from LocationTrack import LocationTrack
+from ChunkedLocationTrack import get_estimated_positions_by_chunk
+
+FORMAT_VERSION = 1
+DEFAULT_CHUNK_SIZE = 4096
+
+_HEADER = struct.Struct('<I5q')
+_STREAM = struct.Struct('<BI')
+_INT_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+class CompressedLocationTrack:
+    def __init__(self, chunks: list[bytes], chunk_bounds: np.ndarray, time_ticks_per_second: int = 1_000_000,
+                 coordinate_ticks_per_degree: int | None = 10_000_000, altitude_ticks_per_meter: int | None = 1000,
+                 max_cached_chunks: int = 4):
+        """A read-only track stored as independently compressed chunks, for keeping long histories in memory.
+
+        Each chunk encodes timestamps as delta-of-delta integer ticks, and coordinates either as
+        deltas of integer ticks or, when their resolution is None, losslessly as the XOR of
+        consecutive float64 bit patterns. The integer streams are narrowed to the smallest integer
+        type that holds them and zlib compressed. Like ChunkedLocationTrack, every chunk after the
+        first repeats the previous chunk's last row, so each query decodes exactly one chunk. The
+        most recently decoded chunks are cached.
+
+        Decoded values are the nearest multiple of their resolution, so the error is at most half
+        a tick: 0.5 microseconds, 5e-8 degrees (about 5 millimeters) and 0.5 millimeters with the
+        defaults. Values already recorded at that resolution, such as the six decimal places of
+        Data/sensorinput.csv, decode exactly.
+
+        Use CompressedLocationTrack.from_track or CompressedLocationTrack.load to create one.
+
+        :param chunks: Encoded chunks, in time order.
+        :param chunk_bounds: Array of shape (len(chunks), 3) holding each chunk's first time, last time and row count.
+        :param time_ticks_per_second: Timestamp resolution.
+        :param coordinate_ticks_per_degree: Latitude and longitude resolution, None for lossless.
+        :param altitude_ticks_per_meter: Altitude resolution, None for lossless.
+        :param max_cached_chunks: How many decoded chunks to keep.
+        """
+        self.chunks = list(chunks)
+        self.chunk_bounds = np.asarray(chunk_bounds, dtype=np.float64).reshape(-1, 3)
+        self.chunk_starts = self.chunk_bounds[:, 0].tolist()
+        self.time_ticks_per_second = time_ticks_per_second
+        self.coordinate_ticks_per_degree = coordinate_ticks_per_degree
+        self.altitude_ticks_per_meter = altitude_ticks_per_meter
+        self.max_cached_chunks = max(1, max_cached_chunks)
+        self.__cache: OrderedDict[int, LocationTrack] = OrderedDict()
+        self.__cache_lock = threading.Lock()
+
+    @classmethod
+    def from_track(cls, track, chunk_size: int = DEFAULT_CHUNK_SIZE, time_ticks_per_second: int = 1_000_000,
+                   coordinate_ticks_per_degree: int | None = 10_000_000, altitude_ticks_per_meter: int | None = 1000,
+                   max_cached_chunks: int = 4) -> 'CompressedLocationTrack':
+        """Compresses any track (LocationTrack, ChunkedLocationTrack, ...) with the given resolutions."""
+        if chunk_size < 2:
+            raise ValueError('Chunks must hold at least two rows.')
+        track = track.to_track()
+        resolutions = (time_ticks_per_second, coordinate_ticks_per_degree, altitude_ticks_per_meter)
+        chunks = []
+        bounds = []
+        start = 0
+        while start < len(track):
+            end = min(start + chunk_size, len(track))
+            chunk = track.slice(start, end)
+            chunks.append(_encode_chunk(chunk, *resolutions))
+            bounds.append((chunk.min_timestamp, chunk.max_timestamp, len(chunk)))
+            if end == len(track):
+                break
+            start = end - 1
+        return cls(chunks, bounds, *resolutions, max_cached_chunks=max_cached_chunks)
+
+    @classmethod
+    def load(cls, path: str, max_cached_chunks: int = 4) -> 'CompressedLocationTrack':
+        """Loads a track written by save. Chunks stay compressed until queried."""
+        with np.load(path, allow_pickle=False) as saved:
+            version, time_ticks, coordinate_ticks, altitude_ticks = (int(value) for value in saved['meta'])
+            if version != FORMAT_VERSION:
+                raise ValueError(f'Unsupported compressed track version {version}.')
+            blob = saved['blob'].tobytes()
+            offsets = saved['offsets']
+            chunk_bounds = saved['chunk_bounds']
+        chunks = [blob[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return cls(chunks, chunk_bounds, time_ticks, coordinate_ticks or None, altitude_ticks or None,
+                   max_cached_chunks)
+
+    def save(self, path: str):
+        """Writes the compressed chunks to path as they are, without decoding them."""
+        offsets = np.cumsum([0] + [len(chunk) for chunk in self.chunks], dtype=np.int64)
+        meta = np.array([FORMAT_VERSION, self.time_ticks_per_second, self.coordinate_ticks_per_degree or 0,
+                         self.altitude_ticks_per_meter or 0], dtype=np.int64)
+        with open(path, 'wb') as file:
+            np.savez(file, meta=meta, chunk_bounds=self.chunk_bounds, offsets=offsets,
+                     blob=np.frombuffer(b''.join(self.chunks), dtype=np.uint8))
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the compressed chunks and their time bounds, excluding the decoded chunk cache."""
+        return sum(len(chunk) for chunk in self.chunks) + self.chunk_bounds.nbytes
+
+    def __len__(self) -> int:
+        return int(self.chunk_bounds[:, 2].sum()) - max(len(self.chunks) - 1, 0)
+
+    @property
+    def min_timestamp(self) -> float:
+        return float(self.chunk_bounds[0, 0]) if self.chunks else np.inf
+
+    @property
+    def max_timestamp(self) -> float:
+        return float(self.chunk_bounds[-1, 1]) if self.chunks else -np.inf
+
+    def chunk(self, index: int) -> LocationTrack:
+        """Returns chunk index decoded, from the cache if possible."""
+        with self.__cache_lock:
+            track = self.__cache.get(index)
+            if track is not None:
+                self.__cache.move_to_end(index)
+                return track
+
+        track = _decode_chunk(self.chunks[index], self.time_ticks_per_second, self.coordinate_ticks_per_degree,
+                              self.altitude_ticks_per_meter)
+        with self.__cache_lock:
+            self.__cache[index] = track
+            while len(self.__cache) > self.max_cached_chunks:
+                self.__cache.popitem(last=False)
+        return track
+
+    def cached_chunk_indices(self) -> list[int]:
+        """Returns the indices of the chunks currently held decoded, least recently used first."""
+        with self.__cache_lock:
+            return list(self.__cache)
+
+    def chunk_for(self, timestamp: float) -> LocationTrack:
+        """Returns the decoded chunk holding the samples used to model timestamp."""
+        return self.chunk(max(bisect.bisect_right(self.chunk_starts, timestamp) - 1, 0))
+
+    def to_track(self) -> LocationTrack:
+        """Decodes the whole track into a single LocationTrack."""
+        if not self.chunks:
+            return LocationTrack.empty()
+        # Decode directly rather than through the cache, which would only be flushed by a full scan.
+        resolutions = (self.time_ticks_per_second, self.coordinate_ticks_per_degree, self.altitude_ticks_per_meter)
+        decoded = [_decode_chunk(chunk, *resolutions) for chunk in self.chunks]
+        return LocationTrack.concatenate([decoded[0]] + [chunk.slice(1, None) for chunk in decoded[1:]])
+
+    def get_nearest_sample(self, timestamp: float) -> LocationSample | None:
+        return self.chunk_for(timestamp).get_nearest_sample(timestamp) if self.chunks else None
+
+    def get_estimated_sample(self, timestamp: float) -> LocationSample | None:
+        return self.chunk_for(timestamp).get_estimated_sample(timestamp) if self.chunks else None
+
+    def get_true_course_degrees(self, timestamp: float) -> float | None:
+        return self.chunk_for(timestamp).get_true_course_degrees(timestamp) if self.chunks else None
+
+    def get_estimated_positions(self, timestamps) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized get_estimated_sample, see LocationTrack.get_estimated_positions.
+        Each chunk a batch touches is decoded (or fetched from the cache) once.
+        """
+        return get_estimated_positions_by_chunk(self.chunk_starts, self.chunk, timestamps)
+
+
+def _encode_chunk(track: LocationTrack, time_ticks_per_second: int, coordinate_ticks_per_degree: int | None,
+                  altitude_ticks_per_meter: int | None) -> bytes:
+    count = len(track)
+    time_ticks = np.round(track.time_utc_seconds * time_ticks_per_second).astype(np.int64)
+    first_delta = int(time_ticks[1] - time_ticks[0]) if count > 1 else 0
+
+    anchors = [int(time_ticks[0]), first_delta]
+    streams = [np.diff(time_ticks, n=2)]
+    for column, ticks_per_unit in ((track.lat_degrees, coordinate_ticks_per_degree),
+                                   (track.lon_degrees, coordinate_ticks_per_degree),
+                                   (track.alt_meters, altitude_ticks_per_meter)):
+        if ticks_per_unit is None:
+            # Lossless: consecutive values share their sign, exponent and leading mantissa bits.
+            values = column.view(np.int64)
+            streams.append(values[1:] ^ values[:-1])
+        else:
+            values = np.round(column * ticks_per_unit).astype(np.int64)
+            streams.append(np.diff(values))
+        anchors.append(int(values[0]))
+
+    parts = [_HEADER.pack(count, *anchors)]
+    for stream in streams:
+        dtype_code = next(code for code, dtype in enumerate(_INT_DTYPES) if not len(stream) or
+                          (np.iinfo(dtype).min <= stream.min() and stream.max() <= np.iinfo(dtype).max))
+        payload = zlib.compress(stream.astype(_INT_DTYPES[dtype_code]).tobytes())
+        parts.append(_STREAM.pack(dtype_code, len(payload)))
+        parts.append(payload)
+    parts.append(np.packbits(track.gap_after).tobytes())
+    return b''.join(parts)
+
+
+def _decode_chunk(chunk: bytes, time_ticks_per_second: int, coordinate_ticks_per_degree: int | None,
+                  altitude_ticks_per_meter: int | None) -> LocationTrack:
+    count, time_start, first_delta, *column_anchors = _HEADER.unpack_from(chunk)
+    offset = _HEADER.size
+    streams = []
+    for _ in range(4):
+        dtype_code, length = _STREAM.unpack_from(chunk, offset)
+        offset += _STREAM.size
+        stream = np.frombuffer(zlib.decompress(chunk[offset:offset + length]), dtype=_INT_DTYPES[dtype_code])
+        streams.append(stream.astype(np.int64))
+        offset += length
+    gap_after = np.unpackbits(np.frombuffer(chunk, dtype=np.uint8, offset=offset), count=count).astype(bool)
+
+    deltas = np.concatenate(([first_delta], first_delta + np.cumsum(streams[0])))[:max(count - 1, 0)]
+    time_ticks = np.concatenate(([time_start], time_start + np.cumsum(deltas)))
+    columns = [time_ticks / time_ticks_per_second]
+    for anchor, stream, ticks_per_unit in zip(column_anchors, streams[1:], (coordinate_ticks_per_degree,
+                                                                           coordinate_ticks_per_degree,
+                                                                           altitude_ticks_per_meter)):
+        if ticks_per_unit is None:
+            values = np.bitwise_xor.accumulate(np.concatenate(([anchor], stream)))
+            columns.append(values.view(np.float64))
+        else:
+            columns.append(np.concatenate(([anchor], anchor + np.cumsum(stream))) / ticks_per_unit)
+    return LocationTrack(*columns, gap_after)
@@ -0,0 +1,144 @@
+import threading
+
+import numpy as np
+
+from LocationSensor import LocationSample
+from LocationTrack import LocationTrack
+
+EARTH_RADIUS_METERS = 6371008.8
+
+
+class DistanceIndex:
+    def __init__(self, geodesic: bool = False, bridge_gaps: bool = False):
+        """Prefix sums of path length and covered time along a track, for range queries in O(log n).
+
+        Row i holds the distance travelled and the time covered by usable segments from the first
+        sample up to sample i. The distance over any time range is the difference of two prefix
+        values, each interpolated linearly within its segment (or extrapolated past either end,
+        matching get_estimated_sample). Rows are appended as samples are ingested, into buffers
+        that grow geometrically, so extending the index costs amortized O(1) per sample and
+        readers never see a partly written row.
+
+        :param geodesic: Measure great-circle distance in meters rather than planar distance in degrees.
+        :param bridge_gaps: Count segments across an invalid reading as travelled in a straight line.
+            By default they are excluded and contribute neither distance nor covered time.
+        """
+        self.geodesic = geodesic
+        self.bridge_gaps = bridge_gaps
+        self.__lock = threading.Lock()
+        self.__times = np.empty(0)
+        self.__distances = np.empty(0)
+        self.__durations = np.empty(0)
+        self.__size = 0
+        self.__view = (self.__times[:0], self.__distances[:0], self.__durations[:0])
+        self.__last: tuple[float, float] | None = None
+        self.__gap_pending = False
+
+    @classmethod
+    def from_track(cls, track, geodesic: bool = False, bridge_gaps: bool = False) -> 'DistanceIndex':
+        index = cls(geodesic, bridge_gaps)
+        index.extend(track.to_track())
+        return index
+
+    def __len__(self) -> int:
+        return len(self.__view[0])
+
+    def extend_samples(self, samples: list[LocationSample | None]):
+        """Appends newly read samples, where None marks an invalid reading."""
+        with self.__lock:
+            if samples and samples[0] is None:
+                self.__gap_pending = True
+            self.__extend(LocationTrack.from_samples(samples))
+
+    def extend(self, track: LocationTrack):
+        """Appends the rows of track, which must not be older than the rows already indexed."""
+        with self.__lock:
+            self.__extend(track)
+
+    def __extend(self, track: LocationTrack):
+        if not len(track):
+            return
+        lat, lon = track.lat_degrees, track.lon_degrees
+        if self.__last is not None:
+            lat = np.concatenate(([self.__last[0]], lat))
+            lon = np.concatenate(([self.__last[1]], lon))
+
+        lengths = self.__segment_lengths(lat, lon)
+        durations = np.diff(np.concatenate((self.__times[self.__size - 1:self.__size], track.time_utc_seconds)))
+        if not self.bridge_gaps:
+            gaps = np.concatenate(([self.__gap_pending], track.gap_after[:-1])) if self.__last is not None \
+                else track.gap_after[:-1]
+            lengths[gaps] = 0.0
+            durations[gaps] = 0.0
+
+        start_distance = self.__distances[self.__size - 1] if self.__size else 0.0
+        start_duration = self.__durations[self.__size - 1] if self.__size else 0.0
+        new_distances = start_distance + np.concatenate(([] if self.__size else [0.0], np.cumsum(lengths)))
+        new_durations = start_duration + np.concatenate(([] if self.__size else [0.0], np.cumsum(durations)))
+
+        self.__reserve(self.__size + len(track))
+        end = self.__size + len(track)
+        self.__times[self.__size:end] = track.time_utc_seconds
+        self.__distances[self.__size:end] = new_distances
+        self.__durations[self.__size:end] = new_durations
+        self.__size = end
+        # Publish the new rows with a single assignment, readers only ever look at a whole view.
+        self.__view = (self.__times[:end], self.__distances[:end], self.__durations[:end])
+        self.__last = (float(track.lat_degrees[-1]), float(track.lon_degrees[-1]))
+        self.__gap_pending = bool(track.gap_after[-1])
+
+    def __reserve(self, size: int):
+        if size <= len(self.__times):
+            return
+        capacity = max(size, 2 * len(self.__times), 64)
+        self.__times = _grown(self.__times, self.__size, capacity)
+        self.__distances = _grown(self.__distances, self.__size, capacity)
+        self.__durations = _grown(self.__durations, self.__size, capacity)
+
+    def __segment_lengths(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        if not self.geodesic:
+            return np.hypot(np.diff(lat), np.diff(lon))
+        lat_radians = np.radians(lat)
+        lon_radians = np.radians(lon)
+        half_chord = (np.sin(np.diff(lat_radians) / 2.0) ** 2
+                      + np.cos(lat_radians[:-1]) * np.cos(lat_radians[1:]) * np.sin(np.diff(lon_radians) / 2.0) ** 2)
+        return 2.0 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(half_chord, 1.0)))
+
+    def distances_at(self, timestamps) -> np.ndarray:
+        """Vectorized cumulative distance from the first sample to each timestamp."""
+        return self.__interpolate(timestamps, 1)
+
+    def distance_between(self, start_time: float, end_time: float) -> float:
+        """Distance travelled from start_time to end_time, negative if end_time is earlier."""
+        return float(self.distances_between([start_time], [end_time])[0])
+
+    def distances_between(self, start_times, end_times) -> np.ndarray:
+        """Vectorized distance_between over arrays of ranges."""
+        view = self.__view
+        return self.__interpolate(end_times, 1, view) - self.__interpolate(start_times, 1, view)
+
+    def covered_duration_between(self, start_time: float, end_time: float) -> float:
+        """Seconds between start_time and end_time modeled by usable segments, which excludes
+        the segments across invalid readings unless gaps are bridged.
+        """
+        view = self.__view
+        return float(self.__interpolate([end_time], 2, view)[0] - self.__interpolate([start_time], 2, view)[0])
+
+    def __interpolate(self, timestamps, column: int, view=None) -> np.ndarray:
+        times, *columns = view or self.__view
+        values = columns[column - 1]
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(times) < 2:
+            return np.zeros(timestamps.shape)
+
+        index = np.clip(np.searchsorted(times, timestamps, side='right') - 1, 0, len(times) - 2)
+        left_time = times[index]
+        delta_time = times[index + 1] - left_time
+        percent = np.divide(timestamps - left_time, delta_time, out=np.zeros(timestamps.shape), where=delta_time > 0)
+        return values[index] + percent * (values[index + 1] - values[index])
+
+
+def _grown(buffer: np.ndarray, size: int, capacity: int) -> np.ndarray:
+    grown = np.empty(capacity)
+    grown[:size] = buffer[:size]
+    return grown
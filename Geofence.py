@@ -0,0 +1,238 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from LocationSensor import LocationSample
+from LocationTrack import LocationTrack
+
+ENTER = 'enter'
+EXIT = 'exit'
+# Fences spanning more grid cells than this in either direction are kept out of the grid.
+OVERSIZED_CELLS = 4
+
+
+class CircleFence:
+    def __init__(self, fence_id, center_lat_degrees: float, center_lon_degrees: float, radius_degrees: float):
+        """A circular geofence. Like the rest of the sensor model, latitude and longitude are treated
+        as x and y on a plane, so the radius is in degrees.
+
+        :param fence_id: Any hashable identifier reported in events.
+        """
+        self.fence_id = fence_id
+        self.center_lat_degrees = center_lat_degrees
+        self.center_lon_degrees = center_lon_degrees
+        self.radius_degrees = radius_degrees
+        self.bounds = (center_lat_degrees - radius_degrees, center_lon_degrees - radius_degrees,
+                       center_lat_degrees + radius_degrees, center_lon_degrees + radius_degrees)
+
+    def contains(self, lat_degrees: float, lon_degrees: float) -> bool:
+        return math.hypot(lat_degrees - self.center_lat_degrees, lon_degrees - self.center_lon_degrees) < self.radius_degrees
+
+    def crossing_fractions(self, lat0: float, lon0: float, lat1: float, lon1: float) -> np.ndarray:
+        """Returns where along the segment, as fractions in [0, 1], it meets the boundary."""
+        delta_lat = lat1 - lat0
+        delta_lon = lon1 - lon0
+        offset_lat = lat0 - self.center_lat_degrees
+        offset_lon = lon0 - self.center_lon_degrees
+        a = delta_lat ** 2 + delta_lon ** 2
+        b = 2.0 * (offset_lat * delta_lat + offset_lon * delta_lon)
+        c = offset_lat ** 2 + offset_lon ** 2 - self.radius_degrees ** 2
+        discriminant = b * b - 4.0 * a * c
+        if a == 0.0 or discriminant < 0.0:
+            return np.empty(0)
+        root = math.sqrt(discriminant)
+        fractions = np.array([(-b - root) / (2.0 * a), (-b + root) / (2.0 * a)])
+        return fractions[(fractions >= 0.0) & (fractions <= 1.0)]
+
+
+class PolygonFence:
+    def __init__(self, fence_id, vertices: list[tuple[float, float]]):
+        """A polygonal geofence, with vertices given as (lat_degrees, lon_degrees) pairs.
+
+        :param fence_id: Any hashable identifier reported in events.
+        """
+        if len(vertices) < 3:
+            raise ValueError('A polygon needs at least three vertices.')
+        self.fence_id = fence_id
+        vertices = np.asarray(vertices, dtype=np.float64)
+        self.lat_degrees = vertices[:, 0]
+        self.lon_degrees = vertices[:, 1]
+        self.next_lat_degrees = np.roll(self.lat_degrees, -1)
+        self.next_lon_degrees = np.roll(self.lon_degrees, -1)
+        self.bounds = (self.lat_degrees.min(), self.lon_degrees.min(), self.lat_degrees.max(), self.lon_degrees.max())
+
+    def contains(self, lat_degrees: float, lon_degrees: float) -> bool:
+        """Even-odd rule: counts the edges crossed by a ray from the point towards increasing longitude."""
+        lat0, lon0, lat1, lon1 = self.lat_degrees, self.lon_degrees, self.next_lat_degrees, self.next_lon_degrees
+        straddles = (lat0 > lat_degrees) != (lat1 > lat_degrees)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing_lon = lon0 + (lat_degrees - lat0) * (lon1 - lon0) / (lat1 - lat0)
+        return bool(np.count_nonzero(straddles & (lon_degrees < crossing_lon)) % 2)
+
+    def crossing_fractions(self, lat0: float, lon0: float, lat1: float, lon1: float) -> np.ndarray:
+        """Returns where along the segment, as fractions in [0, 1], it meets an edge."""
+        delta_lat = lat1 - lat0
+        delta_lon = lon1 - lon0
+        edge_lat = self.next_lat_degrees - self.lat_degrees
+        edge_lon = self.next_lon_degrees - self.lon_degrees
+        denominator = delta_lat * edge_lon - delta_lon * edge_lat
+        offset_lat = self.lat_degrees - lat0
+        offset_lon = self.lon_degrees - lon0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            along_segment = (offset_lat * edge_lon - offset_lon * edge_lat) / denominator
+            along_edge = (offset_lat * delta_lon - offset_lon * delta_lat) / denominator
+        hits = (denominator != 0.0) & (along_segment >= 0.0) & (along_segment <= 1.0) & (along_edge >= 0.0) & (along_edge <= 1.0)
+        return along_segment[hits]
+
+
+class GeofenceEvent:
+    def __init__(self, fence_id, kind: str, time_utc_seconds: float, lat_degrees: float, lon_degrees: float):
+        """Records the sensor entering or leaving a geofence.
+
+        :param kind: ENTER or EXIT.
+        :param time_utc_seconds: Interpolated time at which the boundary was crossed.
+        """
+        self.fence_id = fence_id
+        self.kind = kind
+        self.time_utc_seconds = time_utc_seconds
+        self.lat_degrees = lat_degrees
+        self.lon_degrees = lon_degrees
+
+    def __repr__(self) -> str:
+        return f'GeofenceEvent({self.fence_id!r}, {self.kind!r}, {self.time_utc_seconds!r})'
+
+
+class GeofenceEngine:
+    def __init__(self, fences: list[CircleFence | PolygonFence], cell_size_degrees: float | None = None):
+        """Detects geofence entries and exits along a track, evaluating each segment of the linear
+        model against every fence at once.
+
+        Fence bounding boxes are indexed in a uniform grid, so each segment is only tested
+        against the fences whose box shares a grid cell with the segment's box. The few fences much
+        larger than a cell would fill a large part of the grid, so they are kept in a separate
+        list instead and tested against every segment. Crossing times
+        are interpolated exactly along the segment. Across an invalid reading the path is unknown,
+        so containment is simply re-checked at the next valid sample.
+
+        The engine is incremental: call process with consecutive batches of a track (for example
+        as a TrackReplay subscriber) and it carries its state across them. Use evaluate_track for
+        a one-off pass over a stored track.
+
+        :param fences: The geofences to watch. Fence ids should be unique.
+        :param cell_size_degrees: Grid cell size. Defaults to the median fence bounding box size.
+        """
+        self.fences = list(fences)
+        bounds = np.array([fence.bounds for fence in self.fences], dtype=np.float64).reshape(-1, 4)
+        if cell_size_degrees is None:
+            extents = np.maximum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1])
+            cell_size_degrees = float(np.median(extents)) if len(extents) else 1.0
+        self.cell_size_degrees = cell_size_degrees if cell_size_degrees > 0 else 1.0
+        self.bounds = bounds
+
+        self.grid: dict[tuple[int, int], list[int]] = defaultdict(list)
+        self.oversized: list[int] = []
+        cells = np.floor(bounds / self.cell_size_degrees).astype(np.int64)
+        for fence_index, (min_row, min_col, max_row, max_col) in enumerate(cells):
+            if max(max_row - min_row, max_col - min_col) >= OVERSIZED_CELLS:
+                self.oversized.append(fence_index)
+                continue
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    self.grid[(row, col)].append(fence_index)
+        self.reset()
+
+    def reset(self):
+        """Forgets the tracked position, so the next sample starts a new track."""
+        self.inside: set[int] = set()
+        self.__last: tuple[float, float, float] | None = None
+        self.__gap_pending = False
+
+    @property
+    def inside_fence_ids(self) -> list:
+        """Ids of the fences the sensor is currently inside."""
+        return [self.fences[index].fence_id for index in sorted(self.inside)]
+
+    def evaluate_track(self, track) -> list[GeofenceEvent]:
+        """Returns every event along a whole track, starting from a fresh state."""
+        self.reset()
+        return self.process(track.to_track())
+
+    def process_samples(self, samples: list[LocationSample | None]) -> list[GeofenceEvent]:
+        """Processes newly read samples, where None marks an invalid reading."""
+        if samples and samples[0] is None:
+            self.__gap_pending = True
+        return self.process(LocationTrack.from_samples(samples))
+
+    def process(self, track: LocationTrack) -> list[GeofenceEvent]:
+        """Processes the next batch of a track, returning the events it produced in time order.
+
+        The first sample ever processed (or the first after reset) reports an ENTER event for
+        every fence that already contains it.
+        """
+        events = []
+        times, lats, lons = track.time_utc_seconds, track.lat_degrees, track.lon_degrees
+        for i in range(len(track)):
+            point = (float(times[i]), float(lats[i]), float(lons[i]))
+            if self.__last is None or self.__gap_pending:
+                self.__jump_to(point, events)
+            else:
+                self.__follow_segment(self.__last, point, events)
+            self.__last = point
+            self.__gap_pending = bool(track.gap_after[i])
+        return events
+
+    def candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> set[int]:
+        """Returns the indices of the fences whose bounding box overlaps the given box."""
+        min_row, min_col = math.floor(min_lat / self.cell_size_degrees), math.floor(min_lon / self.cell_size_degrees)
+        max_row, max_col = math.floor(max_lat / self.cell_size_degrees), math.floor(max_lon / self.cell_size_degrees)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self.grid):
+            # A box spanning more cells than are occupied is cheaper to test against every fence.
+            overlaps = ((self.bounds[:, 0] <= max_lat) & (self.bounds[:, 2] >= min_lat)
+                        & (self.bounds[:, 1] <= max_lon) & (self.bounds[:, 3] >= min_lon))
+            return set(np.flatnonzero(overlaps).tolist())
+
+        indices = {index for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1)
+                   for index in self.grid.get((row, col), ())}
+        indices.update(self.oversized)
+        return {index for index in indices
+                if self.bounds[index, 0] <= max_lat and self.bounds[index, 2] >= min_lat
+                and self.bounds[index, 1] <= max_lon and self.bounds[index, 3] >= min_lon}
+
+    def __jump_to(self, point: tuple[float, float, float], events: list[GeofenceEvent]):
+        time_utc_seconds, lat, lon = point
+        now_inside = {index for index in self.candidates(lat, lon, lat, lon) if self.fences[index].contains(lat, lon)}
+        for index in sorted(self.inside - now_inside):
+            events.append(GeofenceEvent(self.fences[index].fence_id, EXIT, time_utc_seconds, lat, lon))
+        for index in sorted(now_inside - self.inside):
+            events.append(GeofenceEvent(self.fences[index].fence_id, ENTER, time_utc_seconds, lat, lon))
+        self.inside = now_inside
+
+    def __follow_segment(self, start: tuple[float, float, float], end: tuple[float, float, float],
+                         events: list[GeofenceEvent]):
+        time0, lat0, lon0 = start
+        time1, lat1, lon1 = end
+        segment_events = []
+        for index in self.candidates(min(lat0, lat1), min(lon0, lon1), max(lat0, lat1), max(lon0, lon1)):
+            fence = self.fences[index]
+            fractions = np.unique(fence.crossing_fractions(lat0, lon0, lat1, lon1))
+            if not len(fractions):
+                continue
+            # Decide the state after each crossing from the midpoint of the following stretch, which
+            # stays correct when the segment grazes a vertex or runs along an edge.
+            was_inside = index in self.inside
+            following = np.append(fractions[1:], 1.0)
+            for fraction, next_fraction in zip(fractions, following):
+                middle = 0.5 * (fraction + next_fraction)
+                now_inside = fence.contains(lat0 + middle * (lat1 - lat0), lon0 + middle * (lon1 - lon0))
+                if now_inside != was_inside:
+                    segment_events.append(GeofenceEvent(fence.fence_id, ENTER if now_inside else EXIT,
+                                                        time0 + fraction * (time1 - time0),
+                                                        lat0 + fraction * (lat1 - lat0), lon0 + fraction * (lon1 - lon0)))
+                    was_inside = now_inside
+            if was_inside:
+                self.inside.add(index)
+            else:
+                self.inside.discard(index)
+        segment_events.sort(key=lambda event: event.time_utc_seconds)
+        events.extend(segment_events)
@@ -0,0 +1,295 @@
+import bisect
+import glob
+import itertools
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+from LocationSensor import LocationSample
+from LocationTrack import LocationTrack
+
+CATALOG_FILENAME = '.track_catalog.json'
+CATALOG_VERSION = 1
+
+
+class SegmentInfo:
+    def __init__(self, path: str, size: int, mtime_ns: int, min_time: float, max_time: float, row_count: int):
+        """Catalog entry describing one track file without holding any of its samples.
+
+        :param path: Absolute path of the track file.
+        :param size: File size in bytes when it was cataloged.
+        :param mtime_ns: File modification time in nanoseconds when it was cataloged.
+        :param min_time: Earliest timestamp in the file, in seconds since the linux epoch.
+        :param max_time: Latest timestamp in the file, in seconds since the linux epoch.
+        :param row_count: Number of rows in the file, including invalid readings.
+        """
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.min_time = min_time
+        self.max_time = max_time
+        self.row_count = row_count
+
+    def is_current(self, stat: os.stat_result) -> bool:
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+
+class LocationDataset:
+    def __init__(self, source: str, catalog_path: str | None = None, max_loaded_segments: int = 8):
+        """A time-indexed view over many rotated track files, such as a directory of sensor logs.
+
+        Opening a dataset only builds (or reuses) a catalog of each file's time range. Samples are
+        parsed lazily, for just the files a query touches, and the most recently used files are kept
+        in memory.
+
+        :param source: A directory containing *.csv track files, or a glob pattern matching them.
+        :param catalog_path: Where to cache the catalog. Defaults to a file beside the track files.
+        :param max_loaded_segments: How many parsed files to keep in memory at once.
+        """
+        if os.path.isdir(source):
+            paths = glob.glob(os.path.join(source, '*.csv'))
+            catalog_dir = source
+        else:
+            paths = glob.glob(source)
+            catalog_dir = os.path.dirname(source) or '.'
+
+        self.catalog_path = catalog_path or os.path.join(catalog_dir, CATALOG_FILENAME)
+        self.max_loaded_segments = max(1, max_loaded_segments)
+        self.segments: list[SegmentInfo] = self.__build_catalog(sorted(os.path.abspath(p) for p in paths))
+        self.__start_times = [segment.min_time for segment in self.segments]
+        # Latest end time of any segment up to each one, non-decreasing, so it can be bisected too.
+        self.__end_times_so_far = list(itertools.accumulate((segment.max_time for segment in self.segments), max))
+        self.__loaded: OrderedDict[str, tuple[LocationTrack, bool]] = OrderedDict()
+
+    @property
+    def min_timestamp(self) -> float:
+        return min((segment.min_time for segment in self.segments), default=float('inf'))
+
+    @property
+    def max_timestamp(self) -> float:
+        return max((segment.max_time for segment in self.segments), default=float('-inf'))
+
+    @property
+    def row_count(self) -> int:
+        return sum(segment.row_count for segment in self.segments)
+
+    def segments_for_window(self, start_time: float, end_time: float) -> list[SegmentInfo]:
+        """Returns the files needed to model every timestamp in [start_time, end_time].
+
+        Besides the files overlapping the window, this includes the nearest file on either side
+        when the window edge is not covered, so that edges can be interpolated across a file
+        rotation (or extrapolated past the ends of the dataset).
+        """
+        first, last = self.__window_range(start_time, end_time)
+        return self.segments[first:last + 1]
+
+    def __window_range(self, start_time: float, end_time: float) -> tuple[int, int]:
+        """Returns the indices of the first and last segments for segments_for_window, in O(log n)
+        for files that do not overlap in time.
+        """
+        if not self.segments:
+            return 0, -1
+        # The first segment ending at or after start_time, and the last one starting by end_time.
+        first = bisect.bisect_left(self.__end_times_so_far, start_time)
+        last = bisect.bisect_right(self.__start_times, end_time) - 1
+        while last >= first and self.segments[last].max_time < start_time:
+            last -= 1
+        if first > last:
+            # The window falls between two files (or outside the dataset), use its neighbours.
+            first = bisect.bisect_right(self.__start_times, start_time)
+            last = first - 1
+        if first > 0 and (first == len(self.segments) or self.segments[first].min_time > start_time):
+            first -= 1
+        if last < len(self.segments) - 1 and (last < 0 or self.segments[last].max_time < end_time):
+            last += 1
+        return max(first, 0), last
+
+    def load_window(self, start_time: float, end_time: float) -> LocationTrack:
+        """Returns a single track holding every sample needed to model [start_time, end_time]."""
+        first, last = self.__window_range(start_time, end_time)
+        if first > last:
+            return LocationTrack.empty()
+        files = [self.__load(segment) for segment in self.segments[first:last + 1]]
+
+        # The catalog covers invalid rows too, so a file can end in a gap, or hold a single valid
+        # row. Keep pulling in neighbours until there is a valid sample at or before the window
+        # start, one after the window end, and two in total for extrapolating past either end of
+        # the dataset. An empty track's min_timestamp is inf and its max_timestamp -inf.
+        while first > 0 and files[0][0].min_timestamp > start_time:
+            first -= 1
+            files.insert(0, self.__load(self.segments[first]))
+        while last < len(self.segments) - 1 and files[-1][0].max_timestamp <= end_time:
+            last += 1
+            files.append(self.__load(self.segments[last]))
+        while sum(len(track) for track, _ in files) < 2 and (first > 0 or last < len(self.segments) - 1):
+            if first > 0:
+                first -= 1
+                files.insert(0, self.__load(self.segments[first]))
+            else:
+                last += 1
+                files.append(self.__load(self.segments[last]))
+
+        # A file can also start with invalid rows, which LocationTrack.from_samples has no earlier
+        # row to flag on, so flag the last valid row of the files before it instead.
+        tracks = []
+        gap_pending = False
+        for track, starts_after_invalid in files:
+            gap_pending = gap_pending or starts_after_invalid
+            if not len(track):
+                continue
+            if gap_pending and tracks:
+                tracks[-1] = _with_gap_after_last(tracks[-1])
+            tracks.append(track)
+            gap_pending = False
+        return LocationTrack.concatenate(tracks)
+
+    def load_segment(self, segment: SegmentInfo) -> LocationTrack:
+        """Returns the parsed samples of one file, reading it only if it is not already cached."""
+        return self.__load(segment)[0]
+
+    def __load(self, segment: SegmentInfo) -> tuple[LocationTrack, bool]:
+        loaded = self.__loaded.get(segment.path)
+        if loaded is not None:
+            self.__loaded.move_to_end(segment.path)
+            return loaded
+
+        loaded = read_track_file(segment.path)
+        self.__loaded[segment.path] = loaded
+        while len(self.__loaded) > self.max_loaded_segments:
+            self.__loaded.popitem(last=False)
+        return loaded
+
+    def loaded_segment_paths(self) -> list[str]:
+        """Returns the paths of the files currently held in memory, least recently used first."""
+        return list(self.__loaded)
+
+    def get_nearest_sample(self, timestamp: float) -> LocationSample | None:
+        return self.load_window(timestamp, timestamp).get_nearest_sample(timestamp)
+
+    def get_estimated_sample(self, timestamp: float) -> LocationSample | None:
+        return self.load_window(timestamp, timestamp).get_estimated_sample(timestamp)
+
+    def get_true_course_degrees(self, timestamp: float) -> float | None:
+        return self.load_window(timestamp, timestamp).get_true_course_degrees(timestamp)
+
+    def __build_catalog(self, paths: list[str]) -> list[SegmentInfo]:
+        cached = self.__read_catalog()
+        segments = []
+        changed = False
+        for path in paths:
+            stat = os.stat(path)
+            segment = cached.get(path)
+            if segment is None or not segment.is_current(stat):
+                segment = scan_track_file(path, stat)
+                changed = True
+            segments.append(segment)
+
+        # The catalog may be shared with other sources over the same directory (e.g. a glob subset),
+        # so keep their entries and only drop those whose files are gone.
+        merged = {path: segment for path, segment in cached.items() if os.path.exists(path)}
+        changed = changed or len(merged) != len(cached)
+        merged.update((segment.path, segment) for segment in segments)
+        if changed:
+            self.__write_catalog(sorted(merged.values(), key=lambda segment: segment.path))
+        # Files without a single readable timestamp have nothing to contribute to a query.
+        segments = [segment for segment in segments if segment.min_time <= segment.max_time]
+        segments.sort(key=lambda segment: (segment.min_time, segment.path))
+        return segments
+
+    def __read_catalog(self) -> dict[str, SegmentInfo]:
+        try:
+            with open(self.catalog_path) as file:
+                contents = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if contents.get('version') != CATALOG_VERSION:
+            return {}
+
+        catalog_dir = os.path.dirname(os.path.abspath(self.catalog_path))
+        segments = {}
+        for entry in contents.get('segments', []):
+            path = os.path.normpath(os.path.join(catalog_dir, entry['path']))
+            segments[path] = SegmentInfo(path, entry['size'], entry['mtime_ns'],
+                                         entry['min_time'], entry['max_time'], entry['row_count'])
+        return segments
+
+    def __write_catalog(self, segments: list[SegmentInfo]):
+        catalog_dir = os.path.dirname(os.path.abspath(self.catalog_path))
+        entries = [{
+            'path': os.path.relpath(segment.path, catalog_dir),
+            'size': segment.size,
+            'mtime_ns': segment.mtime_ns,
+            'min_time': segment.min_time,
+            'max_time': segment.max_time,
+            'row_count': segment.row_count,
+        } for segment in segments]
+
+        # Write to a temporary file of our own first, so a concurrent reader never sees a partial
+        # catalog and concurrent writers never write into each other's.
+        try:
+            descriptor, temporary_path = tempfile.mkstemp(dir=catalog_dir, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'w') as file:
+                    json.dump({'version': CATALOG_VERSION, 'segments': entries}, file)
+                os.replace(temporary_path, self.catalog_path)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
+        except OSError:
+            # A read-only log directory still works, it just gets re-scanned on every open.
+            pass
+
+
+def parse_track_row(row: str) -> tuple[LocationSample | None, float | None]:
+    """Parses one "lat, lon, alt, time" row in the LocationSensor file format.
+
+    :return: The reading (None if it is invalid) and its timestamp (None if that is unreadable too).
+    """
+    row_list = row.split(',')
+    try:
+        time_utc_seconds = float(row_list[3])
+    except (IndexError, ValueError):
+        return None, None
+    try:
+        sample = LocationSample(float(row_list[0]), float(row_list[1]), float(row_list[2]), time_utc_seconds)
+    except ValueError:
+        return None, time_utc_seconds
+    return sample, time_utc_seconds
+
+
+def read_track_file(path: str) -> tuple[LocationTrack, bool]:
+    """Reads every row of a track file into a LocationTrack.
+
+    :return: The track, and whether the file starts with an invalid reading, which the track
+        itself cannot record since it has no row before it.
+    """
+    with open(path, newline='') as file:
+        samples = [parse_track_row(row)[0] for row in file if row.strip()]
+    return LocationTrack.from_samples(samples), bool(samples) and samples[0] is None
+
+
+def _with_gap_after_last(track: LocationTrack) -> LocationTrack:
+    gap_after = track.gap_after.copy()
+    gap_after[-1] = True
+    return LocationTrack(track.time_utc_seconds, track.lat_degrees, track.lon_degrees, track.alt_meters, gap_after)
+
+
+def scan_track_file(path: str, stat: os.stat_result | None = None) -> SegmentInfo:
+    """Builds the catalog entry for a track file by reading only its time column."""
+    stat = stat or os.stat(path)
+    min_time = float('inf')
+    max_time = float('-inf')
+    row_count = 0
+    with open(path, newline='') as file:
+        for row in file:
+            if not row.strip():
+                continue
+            row_count += 1
+            try:
+                time_utc_seconds = float(row.split(',')[3])
+            except (IndexError, ValueError):
+                continue
+            min_time = min(min_time, time_utc_seconds)
+            max_time = max(max_time, time_utc_seconds)
+    return SegmentInfo(path, stat.st_size, stat.st_mtime_ns, min_time, max_time, row_count)
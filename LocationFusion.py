@@ -0,0 +1,130 @@
+import heapq
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from LocationSensor import LocationSensor, LocationSample
+from LocationTrack import LocationTrack
+
+
+def sensor_stream(sensor: LocationSensor, max_samples: int) -> Iterator[LocationSample | None]:
+    """Yields the next max_samples readings of a LocationSensor, None for each invalid reading."""
+    for _ in range(max_samples):
+        yield sensor.read_location()
+
+
+def iter_fused_samples(streams: list[Iterable[LocationSample | None]], weights: list[float] | None = None,
+                       time_tolerance: float = 0.05,
+                       max_disagreement_degrees: float | None = None) -> Iterator[LocationSample | None]:
+    """Merges several time-ordered sample streams into one fused stream.
+
+    Streams are merged with a heap holding one pending sample per stream, so fusing N samples
+    from k streams costs O(N log k) and only ever holds k samples in memory. Samples from
+    different streams that lie within time_tolerance of each other are fused into one sample
+    using a weighted mean. Invalid readings simply drop out, so another stream can fill in
+    for them. A None is yielded before a fused sample when no stream read valid samples
+    continuously since the previous fused sample, matching LocationTrack.from_samples.
+
+    :param streams: Iterables of LocationSample | None, each in non-decreasing time order.
+    :param weights: Optional relative weight of each stream. Defaults to equal weights.
+    :param time_tolerance: Largest time difference in seconds between samples fused together.
+    :param max_disagreement_degrees: When at least three streams contribute to a fused sample,
+        samples further than this from their median position are voted out.
+    """
+    weights = [1.0] * len(streams) if weights is None else list(weights)
+    if len(weights) != len(streams):
+        raise ValueError('Expected one weight per stream.')
+
+    iterators = [iter(stream) for stream in streams]
+    heap = []
+    for stream_index in range(len(iterators)):
+        _push_next(heap, iterators, stream_index)
+
+    # Start time of each stream's current run of samples without an invalid reading in between.
+    clean_since: list[float | None] = [None] * len(streams)
+    # Streams that have produced a sample and whose pending sample continues the same clean run.
+    open_streams: set[int] = set()
+    cluster: list[tuple[int, LocationSample]] = []
+    # Running facts about the cluster, so neither popping nor flushing has to scan it.
+    cluster_streams: set[int] = set()
+    open_members = 0
+    earliest_clean_since = np.inf
+    previous: LocationSample | None = None
+    previous_end = None
+
+    while True:
+        entry = heapq.heappop(heap) if heap else None
+        if cluster and (entry is None or entry[0] - cluster[0][1].time_utc_seconds > time_tolerance
+                        or entry[1] in cluster_streams):
+            # The segment from the previous fused sample is only usable if some stream has been
+            # reading valid samples continuously across it.
+            if previous is not None and not (len(open_streams) > open_members or earliest_clean_since <= previous_end):
+                yield None
+            fused = _fuse(cluster, weights, max_disagreement_degrees)
+            if previous is not None and fused.time_utc_seconds < previous.time_utc_seconds:
+                fused.time_utc_seconds = previous.time_utc_seconds
+            yield fused
+            previous = fused
+            previous_end = max(sample.time_utc_seconds for _, sample in cluster)
+            cluster = []
+            cluster_streams = set()
+            open_members = 0
+            earliest_clean_since = np.inf
+        if entry is None:
+            return
+
+        time_utc_seconds, stream_index, sample, after_invalid = entry
+        # A stream's open state only changes when its next entry is popped, which flushes the
+        # cluster first, so it can be counted once here.
+        if _push_next(heap, iterators, stream_index):
+            open_streams.add(stream_index)
+            open_members += 1
+        else:
+            open_streams.discard(stream_index)
+        if after_invalid or clean_since[stream_index] is None:
+            clean_since[stream_index] = time_utc_seconds
+        cluster.append((stream_index, sample))
+        cluster_streams.add(stream_index)
+        earliest_clean_since = min(earliest_clean_since, clean_since[stream_index])
+
+
+def fuse_streams(streams: list[Iterable[LocationSample | None]], weights: list[float] | None = None,
+                 time_tolerance: float = 0.05, max_disagreement_degrees: float | None = None) -> LocationTrack:
+    """Fuses several sample streams into a single track, see iter_fused_samples."""
+    return LocationTrack.from_samples(list(iter_fused_samples(streams, weights, time_tolerance,
+                                                              max_disagreement_degrees)))
+
+
+def fuse_sensors(sensors: list[LocationSensor], max_samples: int = 15, weights: list[float] | None = None,
+                 time_tolerance: float = 0.05, max_disagreement_degrees: float | None = None) -> LocationTrack:
+    """Reads max_samples from each of several redundant LocationSensors and fuses them into one track."""
+    return fuse_streams([sensor_stream(sensor, max_samples) for sensor in sensors], weights, time_tolerance,
+                        max_disagreement_degrees)
+
+
+def _push_next(heap: list, iterators: list[Iterator], stream_index: int) -> bool:
+    """Pushes the next valid sample of a stream, returning whether it followed without an invalid reading."""
+    after_invalid = False
+    for sample in iterators[stream_index]:
+        if sample is None:
+            after_invalid = True
+            continue
+        heapq.heappush(heap, (sample.time_utc_seconds, stream_index, sample, after_invalid))
+        return not after_invalid
+    return False
+
+
+def _fuse(cluster: list[tuple[int, LocationSample]], weights: list[float],
+          max_disagreement_degrees: float | None) -> LocationSample:
+    if max_disagreement_degrees is not None and len(cluster) >= 3:
+        median_lat = np.median([sample.lat_degrees for _, sample in cluster])
+        median_lon = np.median([sample.lon_degrees for _, sample in cluster])
+        voted = [(index, sample) for index, sample in cluster
+                 if np.hypot(sample.lat_degrees - median_lat, sample.lon_degrees - median_lon) <= max_disagreement_degrees]
+        cluster = voted or cluster
+
+    total = sum(weights[index] for index, _ in cluster)
+    return LocationSample(sum(weights[index] * sample.lat_degrees for index, sample in cluster) / total,
+                          sum(weights[index] * sample.lon_degrees for index, sample in cluster) / total,
+                          sum(weights[index] * sample.alt_meters for index, sample in cluster) / total,
+                          sum(weights[index] * sample.time_utc_seconds for index, sample in cluster) / total)
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+import numpy as np
+
+from LocationTrack import LocationTrack
+from ChunkedLocationTrack import ChunkedLocationTrack
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+def synthesize_track(seed: LocationTrack | ChunkedLocationTrack, n_samples: int, period_seconds: float | None = None,
+                     start_time: float | None = None, jitter_seconds: float = 0.0, noise_degrees: float = 0.0,
+                     noise_meters: float = 0.0, invalid_fraction: float = 0.0,
+                     random_seed: int | None = None) -> LocationTrack:
+    """Generates an arbitrarily long, noisy track that moves like a seed track.
+
+    The seed's segment velocities are replayed cyclically to build a smooth path, which is
+    then sampled with jittered timing and independent position noise, like a real sensor.
+
+    :param seed: Track whose motion is repeated, e.g. the samples of Data/sensorinput.csv.
+    :param n_samples: Number of samples to generate.
+    :param period_seconds: Mean time between samples. Defaults to the seed's median period.
+    :param start_time: Time of the first sample. Defaults to the seed's first sample.
+    :param jitter_seconds: Each period is drawn uniformly from period_seconds +/- jitter_seconds.
+    :param noise_degrees: Standard deviation of the noise added to latitude and longitude.
+    :param noise_meters: Standard deviation of the noise added to altitude.
+    :param invalid_fraction: Probability of an invalid reading following each sample.
+    :param random_seed: Seed for the random number generator, for repeatable tracks.
+    """
+    seed = seed.to_track()
+    if len(seed) < 2:
+        raise ValueError('The seed track needs at least two samples.')
+    rng = np.random.default_rng(random_seed)
+
+    delta_time = np.diff(seed.time_utc_seconds)
+    usable = ~seed.gap_after[:-1] & (delta_time > 0)
+    delta_time = delta_time[usable]
+    velocities = [np.diff(column)[usable] / delta_time for column in (seed.lat_degrees, seed.lon_degrees, seed.alt_meters)]
+
+    period_seconds = float(np.median(delta_time)) if period_seconds is None else period_seconds
+    start_time = seed.min_timestamp if start_time is None else start_time
+    steps = period_seconds + rng.uniform(-jitter_seconds, jitter_seconds, n_samples - 1)
+    steps = np.maximum(steps, period_seconds * 1e-3)
+    times = start_time + np.concatenate(([0.0], np.cumsum(steps)))
+
+    columns = []
+    for origin, velocity, noise in zip((seed.lat_degrees[0], seed.lon_degrees[0], seed.alt_meters[0]), velocities,
+                                       (noise_degrees, noise_degrees, noise_meters)):
+        path = origin + np.concatenate(([0.0], np.cumsum(np.resize(velocity, n_samples - 1) * steps)))
+        columns.append(path + rng.normal(0.0, noise, n_samples) if noise else path)
+
+    gap_after = rng.random(n_samples) < invalid_fraction
+    gap_after[-1] = False
+    return LocationTrack(times, *columns, gap_after)
+
+
+class TrackReplay:
+    def __init__(self, source: LocationTrack | ChunkedLocationTrack | ModeledLocationSensor, speed: float | None = 1.0,
+                 batch_size: int = 4096, resample_period_seconds: float | None = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """Replays a track to subscribers on a real-time or accelerated clock.
+
+        Samples are delivered in batches: every call to a subscriber receives a read-only
+        LocationTrack holding all the samples that have come due since the previous batch (up to
+        batch_size), so that the per-sample cost of fan-out stays in numpy rather than Python.
+        The same batch object is shared by all subscribers.
+
+        :param source: The track to replay, or a ModeledLocationSensor whose current snapshot is replayed.
+        :param speed: Replay rate relative to real time, e.g. 10 replays ten seconds of track per
+            second. None replays as fast as the subscribers can consume it.
+        :param batch_size: Most samples delivered in one batch.
+        :param resample_period_seconds: If set, replay estimated positions at this fixed period
+            instead of the raw samples.
+        :param clock: Monotonic clock in seconds, replaceable for testing.
+        :param sleep: Sleep function matching clock, replaceable for testing.
+        """
+        if isinstance(source, ModeledLocationSensor):
+            source = source.snapshot()
+        self.track = source.to_track()
+        self.speed = speed
+        self.batch_size = max(1, batch_size)
+        self.resample_period_seconds = resample_period_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.subscribers: list[Callable[[LocationTrack], None]] = []
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+    def subscribe(self, callback: Callable[[LocationTrack], None]) -> Callable[[LocationTrack], None]:
+        """Registers callback to receive every batch, returning it for later unsubscribe."""
+        self.subscribers = self.subscribers + [callback]
+        return callback
+
+    def unsubscribe(self, callback: Callable[[LocationTrack], None]):
+        self.subscribers = [subscriber for subscriber in self.subscribers if subscriber is not callback]
+
+    def __len__(self) -> int:
+        """Number of rows the replay steps through, before dropping invalid resampled estimates."""
+        if not len(self.track):
+            return 0
+        if self.resample_period_seconds is None:
+            return len(self.track)
+        duration = self.track.max_timestamp - self.track.min_timestamp
+        return int(np.floor(duration / self.resample_period_seconds)) + 1
+
+    def row_time(self, index: int) -> float:
+        """Track time of replay row index."""
+        if self.resample_period_seconds is None:
+            return float(self.track.time_utc_seconds[index])
+        return self.track.min_timestamp + index * self.resample_period_seconds
+
+    def batches(self) -> Iterator[LocationTrack]:
+        """Yields batches as they come due on the replay clock."""
+        n = len(self)
+        if not n:
+            return
+        start_time = self.row_time(0)
+        wall_start = self.clock()
+        index = 0
+        while index < n and not self.__stop.is_set():
+            end = min(index + self.batch_size, n)
+            if self.speed is not None:
+                end = min(end, self.__due_rows(start_time + (self.clock() - wall_start) * self.speed))
+                if end <= index:
+                    self.sleep(max(wall_start + (self.row_time(index) - start_time) / self.speed - self.clock(), 0.0))
+                    continue
+            yield self.__batch(index, end)
+            index = end
+
+    def run(self) -> int:
+        """Replays the whole track to the subscribers, returning the number of samples delivered."""
+        delivered = 0
+        for batch in self.batches():
+            for subscriber in self.subscribers:
+                subscriber(batch)
+            delivered += len(batch)
+        return delivered
+
+    def start(self) -> threading.Thread:
+        """Runs the replay on a background thread."""
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.run, daemon=True)
+        self.__thread.start()
+        return self.__thread
+
+    def stop(self):
+        """Stops a replay started with start(), waiting for the current batch to be delivered."""
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __due_rows(self, replay_time: float) -> int:
+        """Number of rows whose time is at or before replay_time."""
+        if self.resample_period_seconds is None:
+            return int(np.searchsorted(self.track.time_utc_seconds, replay_time, side='right'))
+        return int(np.floor((replay_time - self.track.min_timestamp) / self.resample_period_seconds)) + 1
+
+    def __batch(self, start: int, end: int) -> LocationTrack:
+        if self.resample_period_seconds is None:
+            return self.track.slice(start, end)
+
+        # Estimate one extra row, so a gap right after the batch still flags its last row.
+        times = self.track.min_timestamp + np.arange(start, end + 1) * self.resample_period_seconds
+        lat, lon, alt = self.track.get_estimated_positions(times)
+        batch = LocationTrack.from_positions(times, lat, lon, alt)
+        if not np.isnan(lat[-1]):
+            batch = batch.slice(0, len(batch) - 1)
+        return batch
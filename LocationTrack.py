@@ -0,0 +1,226 @@
+import math
+
+import numpy as np
+
+from LocationSensor import LocationSample
+
+
+class LocationTrack:
+    def __init__(self, time_utc_seconds, lat_degrees, lon_degrees, alt_meters, gap_after=None):
+        """An immutable, columnar set of valid LocationSensor readings ordered by time.
+
+        Invalid readings are not stored as rows. Instead, gap_after[i] is set when one or more
+        invalid readings were seen between row i and row i+1, so that the segment between them
+        can be treated as unusable for interpolation.
+
+        :param time_utc_seconds: Sample times in seconds since the linux epoch, non-decreasing.
+        :param lat_degrees: Sample latitudes in degrees.
+        :param lon_degrees: Sample longitudes in degrees.
+        :param alt_meters: Sample altitudes in meters.
+        :param gap_after: Optional boolean flags marking an invalid reading after each row.
+        """
+        self.time_utc_seconds = _frozen(time_utc_seconds)
+        self.lat_degrees = _frozen(lat_degrees)
+        self.lon_degrees = _frozen(lon_degrees)
+        self.alt_meters = _frozen(alt_meters)
+        if gap_after is None:
+            gap_after = np.zeros(len(self.time_utc_seconds), dtype=bool)
+        self.gap_after = _frozen(gap_after, dtype=bool)
+
+        n = len(self.time_utc_seconds)
+        if not (len(self.lat_degrees) == len(self.lon_degrees) == len(self.alt_meters) == len(self.gap_after) == n):
+            raise ValueError('All track columns must have the same length.')
+        if n > 1 and np.any(np.diff(self.time_utc_seconds) < 0):
+            raise ValueError('Track timestamps must be non-decreasing.')
+
+    @classmethod
+    def from_samples(cls, samples: list[LocationSample | None]) -> 'LocationTrack':
+        """Builds a track from readings in the order they were read, where None marks an invalid reading."""
+        times, lats, lons, alts, gaps = [], [], [], [], []
+        for sample in samples:
+            if sample is None:
+                # A trailing gap is kept too, so that it survives concatenation with a later track.
+                if gaps:
+                    gaps[-1] = True
+                continue
+            times.append(sample.time_utc_seconds)
+            lats.append(sample.lat_degrees)
+            lons.append(sample.lon_degrees)
+            alts.append(sample.alt_meters)
+            gaps.append(False)
+        return cls(times, lats, lons, alts, gaps)
+
+    @classmethod
+    def concatenate(cls, tracks: list['LocationTrack']) -> 'LocationTrack':
+        """Joins several tracks into one, re-sorting by time if the inputs overlap."""
+        tracks = [track for track in tracks if len(track)]
+        if not tracks:
+            return cls.empty()
+        if len(tracks) == 1:
+            return tracks[0]
+
+        times = np.concatenate([track.time_utc_seconds for track in tracks])
+        columns = [
+            np.concatenate([track.lat_degrees for track in tracks]),
+            np.concatenate([track.lon_degrees for track in tracks]),
+            np.concatenate([track.alt_meters for track in tracks]),
+            np.concatenate([track.gap_after for track in tracks]),
+        ]
+        if np.any(np.diff(times) < 0):
+            order = np.argsort(times, kind='stable')
+            times = times[order]
+            columns = [column[order] for column in columns]
+        return cls(times, *columns)
+
+    @classmethod
+    def from_positions(cls, time_utc_seconds, lat_degrees, lon_degrees, alt_meters) -> 'LocationTrack':
+        """Builds a track from position arrays such as those of get_estimated_positions, where a NaN
+        latitude marks an invalid row.
+        """
+        lat_degrees = np.asarray(lat_degrees, dtype=np.float64)
+        valid = ~np.isnan(lat_degrees)
+        # Flag the last valid row before every invalid one.
+        previous_valid = np.cumsum(valid)[~valid] - 1
+        gap_after = np.zeros(int(valid.sum()), dtype=bool)
+        gap_after[previous_valid[previous_valid >= 0]] = True
+        return cls(np.asarray(time_utc_seconds, dtype=np.float64)[valid], lat_degrees[valid],
+                   np.asarray(lon_degrees, dtype=np.float64)[valid], np.asarray(alt_meters, dtype=np.float64)[valid],
+                   gap_after)
+
+    @classmethod
+    def empty(cls) -> 'LocationTrack':
+        return cls([], [], [], [], [])
+
+    def slice(self, start: int, end: int) -> 'LocationTrack':
+        """Returns rows [start, end) as a new track sharing this track's (read-only) memory."""
+        track = LocationTrack.__new__(LocationTrack)
+        track.time_utc_seconds = self.time_utc_seconds[start:end]
+        track.lat_degrees = self.lat_degrees[start:end]
+        track.lon_degrees = self.lon_degrees[start:end]
+        track.alt_meters = self.alt_meters[start:end]
+        track.gap_after = self.gap_after[start:end]
+        return track
+
+    def to_track(self) -> 'LocationTrack':
+        return self
+
+    def __len__(self) -> int:
+        return len(self.time_utc_seconds)
+
+    @property
+    def min_timestamp(self) -> float:
+        return float(self.time_utc_seconds[0]) if len(self) else np.inf
+
+    @property
+    def max_timestamp(self) -> float:
+        return float(self.time_utc_seconds[-1]) if len(self) else -np.inf
+
+    def sample(self, index: int) -> LocationSample:
+        """Returns row index of the track as a LocationSample."""
+        return LocationSample(float(self.lat_degrees[index]), float(self.lon_degrees[index]),
+                              float(self.alt_meters[index]), float(self.time_utc_seconds[index]))
+
+    def nearest_index(self, timestamp: float) -> int | None:
+        """Returns the row closest in time to timestamp, or None if the track is empty."""
+        n = len(self)
+        if n == 0:
+            return None
+        right = int(np.searchsorted(self.time_utc_seconds, timestamp))
+        if right == 0:
+            return 0
+        if right == n:
+            return n - 1
+        left = right - 1
+        if timestamp - self.time_utc_seconds[left] <= self.time_utc_seconds[right] - timestamp:
+            return left
+        return right
+
+    def segment_index(self, timestamp: float) -> int:
+        """Returns i such that rows i and i+1 are the samples used to model timestamp.
+
+        Timestamps before the first sample or after the last one map to the first or last segment,
+        which is then extrapolated. The track must contain at least two samples.
+        """
+        index = int(np.searchsorted(self.time_utc_seconds, timestamp, side='right')) - 1
+        return min(max(index, 0), len(self) - 2)
+
+    def get_nearest_sample(self, timestamp: float) -> LocationSample | None:
+        index = self.nearest_index(timestamp)
+        return None if index is None else self.sample(index)
+
+    def get_estimated_sample(self, timestamp: float, index: int | None = None) -> LocationSample | None:
+        """Linearly interpolates (or extrapolates past either end) the position at timestamp.
+
+        :param index: Optional segment index for timestamp, if the caller has already located it.
+        """
+        if len(self) < 2:
+            return None
+        if index is None:
+            index = self.segment_index(timestamp)
+
+        times = self.time_utc_seconds
+        if timestamp == times[index]:
+            return self.sample(index)
+        if timestamp == times[index + 1]:
+            return self.sample(index + 1)
+        if times[index] < timestamp < times[index + 1] and self.gap_after[index]:
+            return None
+
+        delta_time = times[index + 1] - times[index]
+        percent = (timestamp - times[index]) / delta_time
+        lat = self.lat_degrees[index] + percent * (self.lat_degrees[index + 1] - self.lat_degrees[index])
+        lon = self.lon_degrees[index] + percent * (self.lon_degrees[index + 1] - self.lon_degrees[index])
+        alt = self.alt_meters[index] + percent * (self.alt_meters[index + 1] - self.alt_meters[index])
+        return LocationSample(float(lat), float(lon), float(alt), timestamp)
+
+    def get_true_course_degrees(self, timestamp: float, index: int | None = None) -> float | None:
+        """Returns the direction of travel over the segment used to model timestamp.
+
+        :param index: Optional segment index for timestamp, if the caller has already located it.
+        """
+        if len(self) < 2:
+            return None
+        if index is None:
+            index = self.segment_index(timestamp)
+
+        times = self.time_utc_seconds
+        if times[0] <= timestamp <= times[-1] and self.gap_after[index]:
+            return None
+
+        delta_lat = self.lat_degrees[index + 1] - self.lat_degrees[index]
+        delta_lon = self.lon_degrees[index + 1] - self.lon_degrees[index]
+        return math.degrees(math.atan2(delta_lat, delta_lon))
+
+    def get_estimated_positions(self, timestamps) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized get_estimated_sample for an array of timestamps.
+
+        :return: Latitude, longitude and altitude arrays, holding NaN wherever get_estimated_sample
+            would return None.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(self) < 2:
+            nan = np.full(timestamps.shape, np.nan)
+            return nan, nan.copy(), nan.copy()
+
+        times = self.time_utc_seconds
+        index = np.clip(np.searchsorted(times, timestamps, side='right') - 1, 0, len(self) - 2)
+        left_time = times[index]
+        right_time = times[index + 1]
+        delta_time = right_time - left_time
+        percent = np.divide(timestamps - left_time, delta_time, out=np.zeros(timestamps.shape), where=delta_time > 0)
+
+        columns = []
+        for column in (self.lat_degrees, self.lon_degrees, self.alt_meters):
+            left = column[index]
+            columns.append(left + percent * (column[index + 1] - left))
+
+        invalid = self.gap_after[index] & (timestamps > left_time) & (timestamps < right_time)
+        for column in columns:
+            column[invalid] = np.nan
+        return tuple(columns)
+
+
+def _frozen(values, dtype=np.float64) -> np.ndarray:
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
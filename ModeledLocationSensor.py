@@ -2,9 +2,19 @@
 # Date Created: 4/29/2023
 # Copyright: Trident Sensing LLC. (colin.pollard@tridentsensing.com)
 
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
 from LocationSensor import LocationSensor, LocationSample
-import numpy as np
-import math
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime, so that importing this module does not pull in numpy.
+    from LocationTrack import LocationTrack
+    from ChunkedLocationTrack import ChunkedLocationTrack
+    from TrackCursor import TrackCursor
+    from DistanceIndex import DistanceIndex
 
 ''' 
 Welcome to the first attempt at a technical interview question for prospective TS engineers!
@@ -26,7 +36,8 @@ Luke Majors: 16:54, 33:18,
 '''
 
 class ModeledLocationSensor:
-    def __init__(self, max_samples: int=15, sensor_read_path='Data/sensorinput.csv'):
+    def __init__(self, max_samples: int=15, sensor_read_path='Data/sensorinput.csv', lazy: bool=False,
+                 cache_dir: str | None=None):
         """
         Motivation: 
         Let's say that you have a sensor that reads position per time. Because you are
@@ -46,8 +57,132 @@ class ModeledLocationSensor:
 
         :param max_samples: _description_
         :type max_samples: _type_
+        :param lazy: Defer reading the sensor and building the track until the first query.
+        :param cache_dir: Optional directory in which to cache the built track between processes.
+        """
+        self.sensor: LocationSensor | None = None
+        self.sensor_read_path = sensor_read_path
+        self.max_samples = max_samples
+        self.samples_read = 0
+        self.cache_dir = cache_dir
+        self.ingest_lock = threading.RLock()
+        self._track: LocationTrack | ChunkedLocationTrack | None = None
+        self.__distance_indexes: dict[tuple[bool, bool], DistanceIndex] = {}
+        if not lazy:
+            self.__load()
+
+    @classmethod
+    def from_track(cls, track: LocationTrack | ChunkedLocationTrack) -> ModeledLocationSensor:
+        """Builds a ModeledLocationSensor over an already loaded track instead of reading a LocationSensor."""
+        modeled = cls.__new__(cls)
+        modeled.sensor = None
+        modeled.sensor_read_path = None
+        modeled.max_samples = len(track)
+        modeled.samples_read = 0
+        modeled.cache_dir = None
+        modeled.ingest_lock = threading.RLock()
+        modeled._track = track
+        modeled.__distance_indexes = {}
+        return modeled
+
+    @property
+    def track(self) -> LocationTrack | ChunkedLocationTrack:
+        """The current immutable track, built on first access for a lazy ModeledLocationSensor."""
+        track = self._track
+        if track is None:
+            with self.ingest_lock:
+                if self._track is None:
+                    self.__load()
+                track = self._track
+        return track
+
+    def snapshot(self) -> LocationTrack | ChunkedLocationTrack:
+        """Returns the current immutable track. Several queries against one snapshot always agree
+        with each other, even while another thread is ingesting new samples.
         """
-        pass
+        return self.track
+
+    def cursor(self) -> TrackCursor:
+        """Returns a TrackCursor for fast queries at steadily increasing timestamps, e.g. playback."""
+        from TrackCursor import TrackCursor
+
+        return TrackCursor(self)
+
+    def distance_index(self, geodesic: bool = False, bridge_gaps: bool = False) -> DistanceIndex:
+        """Returns a DistanceIndex over this sensor's track, which ingest keeps up to date.
+
+        The first call for each combination of options builds the index from the current track.
+        """
+        from DistanceIndex import DistanceIndex
+
+        with self.ingest_lock:
+            index = self.__distance_indexes.get((geodesic, bridge_gaps))
+            if index is None:
+                index = DistanceIndex.from_track(self.track, geodesic, bridge_gaps)
+                self.__distance_indexes[(geodesic, bridge_gaps)] = index
+            return index
+
+    def ingest(self, samples: list[LocationSample | None]):
+        """Appends newly read samples, where None marks an invalid reading.
+
+        Ingest builds a new snapshot and publishes it with a single reference assignment, so
+        concurrent readers never block and never see a partly updated track. Only other
+        ingesting threads are serialized.
+        """
+        from ChunkedLocationTrack import ChunkedLocationTrack
+
+        with self.ingest_lock:
+            track = self.track
+            if not isinstance(track, ChunkedLocationTrack):
+                track = ChunkedLocationTrack.from_track(track.to_track())
+            self._track = track.appended(samples)
+            self.max_samples += len(samples)
+            for index in self.__distance_indexes.values():
+                index.extend_samples(samples)
+
+    def read_sensor(self, count: int = 1):
+        """Reads count more samples from the LocationSensor and ingests them."""
+        if self.sensor_read_path is None:
+            raise ValueError('This ModeledLocationSensor was not created from a LocationSensor.')
+        with self.ingest_lock:
+            if self._track is None:
+                self.__load()
+            self.ingest([self.__read_location() for _ in range(count)])
+
+    def __read_location(self) -> LocationSample | None:
+        if self.sensor is None:
+            # The track came from the cache, so skip past the samples it already holds.
+            self.sensor = LocationSensor(sensor_read_path=self.sensor_read_path)
+            for _ in range(self.samples_read):
+                self.sensor.read_location()
+        self.samples_read += 1
+        return self.sensor.read_location()
+
+    def __load(self):
+        from ChunkedLocationTrack import ChunkedLocationTrack
+
+        track = None
+        if self.cache_dir is not None:
+            from TrackCache import load_cached_track
+            track = load_cached_track(self.cache_dir, self.sensor_read_path, self.max_samples)
+        if track is not None:
+            self.samples_read = self.max_samples
+            self._track = ChunkedLocationTrack.from_track(track)
+            return
+
+        samples = [self.__read_location() for _ in range(self.max_samples)]
+        self._track = ChunkedLocationTrack.from_samples(samples)
+        if self.cache_dir is not None:
+            from TrackCache import store_cached_track
+            store_cached_track(self.cache_dir, self.sensor_read_path, self.max_samples, self._track.to_track())
+
+    @property
+    def min_timestamp(self) -> float:
+        return self.track.min_timestamp
+
+    @property
+    def max_timestamp(self) -> float:
+        return self.track.max_timestamp
 
 
     def get_nearest_sample(self, timestamp: float) -> LocationSample | None:
@@ -68,7 +203,7 @@ class ModeledLocationSensor:
         :param timestamp: Requested timestamp of the sample.
         :return: A LocationSample at the closest sensor reading to the requested timestamp.
         """
-        pass
+        return self.track.get_nearest_sample(timestamp)
         
 
     def get_estimated_sample(self, timestamp: float) -> LocationSample | None:
@@ -107,7 +242,7 @@ class ModeledLocationSensor:
         :return: A new LocationSample containing the estimated position at the requested timestamp.
         :rtype: LocationSample | None
         """
-        pass
+        return self.track.get_estimated_sample(timestamp)
 
 
     def get_true_course_degrees(self, timestamp: float) -> float | None:
@@ -139,6 +274,5 @@ class ModeledLocationSensor:
         :return: The track of the sensor in true degrees.
         :rtype: float | None
         """
-        
+        return self.track.get_true_course_degrees(timestamp)
 
-        pass
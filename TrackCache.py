@@ -0,0 +1,76 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from LocationTrack import LocationTrack
+
+CACHE_VERSION = 1
+
+
+def cache_path(cache_dir: str, sensor_read_path: str, max_samples: int) -> str:
+    """Returns where the track built from max_samples readings of sensor_read_path is cached."""
+    key = hashlib.sha1(f'{os.path.abspath(sensor_read_path)}:{max_samples}'.encode()).hexdigest()
+    return os.path.join(cache_dir, f'{key}.npz')
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_cached_track(cache_dir: str, sensor_read_path: str, max_samples: int) -> LocationTrack | None:
+    """Returns the cached track for a sensor file, or None if there is no up to date cache entry.
+
+    An entry is reused when the file's size and modification time are unchanged. If only the
+    modification time differs (the file was copied or touched), the file's content hash decides.
+    """
+    path = cache_path(cache_dir, sensor_read_path, max_samples)
+    try:
+        stat = os.stat(sensor_read_path)
+        with np.load(path, allow_pickle=False) as cached:
+            version, size, mtime_ns = (int(value) for value in cached['meta'])
+            digest = str(cached['digest'])
+            track = LocationTrack(cached['time_utc_seconds'], cached['lat_degrees'], cached['lon_degrees'],
+                                  cached['alt_meters'], cached['gap_after'])
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # A truncated or corrupt entry is just a miss, the track gets parsed again.
+        return None
+
+    if version != CACHE_VERSION or size != stat.st_size:
+        return None
+    if mtime_ns != stat.st_mtime_ns:
+        if file_digest(sensor_read_path) != digest:
+            return None
+        store_cached_track(cache_dir, sensor_read_path, max_samples, track, digest)
+    return track
+
+
+def store_cached_track(cache_dir: str, sensor_read_path: str, max_samples: int, track: LocationTrack,
+                       digest: str | None = None):
+    """Caches the track built from a sensor file. Failing to write the cache is not an error."""
+    try:
+        stat = os.stat(sensor_read_path)
+        digest = digest or file_digest(sensor_read_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        path = cache_path(cache_dir, sensor_read_path, max_samples)
+        # Write to a temporary file of our own first, so concurrent processes never load a partial
+        # entry or write into each other's.
+        descriptor, temporary_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(file, meta=np.array([CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64),
+                         digest=np.array(digest), time_utc_seconds=track.time_utc_seconds,
+                         lat_degrees=track.lat_degrees, lon_degrees=track.lon_degrees,
+                         alt_meters=track.alt_meters, gap_after=track.gap_after)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+    except OSError:
+        pass
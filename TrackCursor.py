@@ -0,0 +1,122 @@
+import bisect
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from LocationSensor import LocationSample
+from LocationTrack import LocationTrack
+from ChunkedLocationTrack import ChunkedLocationTrack
+from CompactLocationTrack import CompactChunk, CompactLocationTrack
+from CompressedLocationTrack import CompressedLocationTrack
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+class TrackCursor:
+    def __init__(self, source: ModeledLocationSensor | LocationTrack | ChunkedLocationTrack | CompressedLocationTrack
+                 | CompactLocationTrack):
+        """A stateful reader for playback, where queries arrive with steadily increasing timestamps.
+
+        The cursor remembers the segment used by the previous query and gallops forward from it
+        (checking 1, 2, 4, ... segments ahead before a bounded binary search), so a sequential
+        sweep costs amortized O(1) per query. A backward jump falls back to a full binary search.
+        When reading from a ModeledLocationSensor, the cursor follows newly ingested snapshots.
+        Chunked, compressed and compact tracks are read one chunk at a time, so a compressed track
+        only decodes a chunk when the cursor moves into it, and a compact one is searched in its
+        own integer time ticks.
+
+        :param source: A ModeledLocationSensor, or a track to read directly.
+        """
+        self.source = source
+        self.chunk_index = 0
+        self.index = 0
+        self.__snapshot = None
+        self.__refresh()
+
+    def __refresh(self):
+        snapshot = self.source.snapshot() if isinstance(self.source, ModeledLocationSensor) else self.source
+        if snapshot is self.__snapshot:
+            return
+        if isinstance(snapshot, (ChunkedLocationTrack, CompressedLocationTrack, CompactLocationTrack)):
+            self.chunk_starts = snapshot.chunk_starts
+            self.__get_chunk = snapshot.chunk
+        elif isinstance(snapshot, LocationTrack):
+            self.chunk_starts = [snapshot.min_timestamp] if len(snapshot) else []
+            self.__get_chunk = lambda index: snapshot
+        else:
+            raise TypeError(f'A TrackCursor cannot read a {type(snapshot).__name__}.')
+        self.__snapshot = snapshot
+        # Snapshots only ever grow, so the cursor position stays meaningful.
+        self.chunk_index = min(self.chunk_index, max(len(self.chunk_starts) - 1, 0))
+        self.chunk = self.__get_chunk(self.chunk_index) if self.chunk_starts else None
+
+    def seek(self, timestamp: float) -> tuple[LocationTrack | CompactChunk, int] | None:
+        """Moves the cursor to timestamp, returning the chunk and the segment index within it used
+        to model timestamp, or None if the track has no segments.
+        """
+        self.__refresh()
+        if self.chunk is None:
+            return None
+
+        chunk_index = self.chunk_index
+        next_start = self.chunk_starts[chunk_index + 1] if chunk_index + 1 < len(self.chunk_starts) else np.inf
+        if timestamp >= next_start or (chunk_index > 0 and timestamp < self.chunk_starts[chunk_index]):
+            chunk_index = max(bisect.bisect_right(self.chunk_starts, timestamp) - 1, 0)
+        if chunk_index != self.chunk_index:
+            self.chunk_index = chunk_index
+            self.chunk = self.__get_chunk(chunk_index)
+            self.index = 0
+
+        chunk = self.chunk
+        if len(chunk) < 2:
+            return None
+        if isinstance(chunk, CompactChunk):
+            self.index = _gallop(chunk.time_ticks, chunk.ticks_for(timestamp), self.index)
+        else:
+            self.index = _gallop(chunk.time_utc_seconds, timestamp, self.index)
+        return chunk, self.index
+
+    def get_nearest_sample(self, timestamp: float) -> LocationSample | None:
+        position = self.seek(timestamp)
+        if position is None:
+            return self.chunk.get_nearest_sample(timestamp) if self.chunk is not None else None
+        chunk, index = position
+        if isinstance(chunk, CompactChunk):
+            return chunk.rows(index, index + 2).get_nearest_sample(timestamp)
+        times = chunk.time_utc_seconds
+        if timestamp - times[index] <= times[index + 1] - timestamp:
+            return chunk.sample(index)
+        return chunk.sample(index + 1)
+
+    def get_estimated_sample(self, timestamp: float) -> LocationSample | None:
+        position = self.seek(timestamp)
+        return None if position is None else position[0].get_estimated_sample(timestamp, position[1])
+
+    def get_true_course_degrees(self, timestamp: float) -> float | None:
+        position = self.seek(timestamp)
+        return None if position is None else position[0].get_true_course_degrees(timestamp, position[1])
+
+    def iter_estimated_samples(self, timestamps: Iterable[float]) -> Iterator[LocationSample | None]:
+        """Yields get_estimated_sample for each of timestamps, e.g. the frames of a playback."""
+        for timestamp in timestamps:
+            yield self.get_estimated_sample(timestamp)
+
+
+def _gallop(times: np.ndarray, timestamp: float, start: int) -> int:
+    """Returns the segment index for timestamp (see LocationTrack.segment_index), searching
+    forward from start when timestamp has not moved backwards.
+    """
+    last = len(times) - 2
+    start = min(start, last)
+    if timestamp < times[start]:
+        return min(max(int(np.searchsorted(times, timestamp, side='right')) - 1, 0), last)
+    if start == last or timestamp < times[start + 1]:
+        return start
+
+    # times[start + 1] <= timestamp, double the step until a row beyond timestamp is found.
+    low = start + 1
+    step = 1
+    while low + step <= last + 1 and times[low + step] <= timestamp:
+        low += step
+        step *= 2
+    high = min(low + step, last + 2)
+    return min(low + int(np.searchsorted(times[low:high], timestamp, side='right')) - 1, last)
@@ -0,0 +1,124 @@
+import sys
+sys.path.append('..')
+
+import threading
+import time
+import unittest
+import numpy as np
+from LocationSensor import LocationSensor
+from LocationTrack import LocationTrack
+from ChunkedLocationTrack import ChunkedLocationTrack
+from ModeledLocationSensor import ModeledLocationSensor
+from LocationReplay import synthesize_track
+
+TIMESTAMPS = [1.5, 10.5, 10.75, 12.52, 14.0, 17.48, 18.0, 18.52, 19.0, 20.0, 20.49, 21.0, 24.5, 34.5]
+
+
+def read_all_samples():
+    ls = LocationSensor()
+    return [ls.read_location() for _ in range(15)]
+
+
+class TestChunkedLocationTrack(unittest.TestCase):
+    def assertSameModel(self, track, expected):
+        for timestamp in TIMESTAMPS:
+            expected_sample = expected.get_estimated_sample(timestamp)
+            sample = track.get_estimated_sample(timestamp)
+            if expected_sample is None:
+                self.assertIsNone(sample, timestamp)
+            else:
+                self.assertAlmostEqual(sample.lat_degrees, expected_sample.lat_degrees)
+                self.assertAlmostEqual(sample.lon_degrees, expected_sample.lon_degrees)
+            self.assertEqual(track.get_true_course_degrees(timestamp), expected.get_true_course_degrees(timestamp))
+            self.assertEqual(track.get_nearest_sample(timestamp).time_utc_seconds,
+                             expected.get_nearest_sample(timestamp).time_utc_seconds)
+
+    def test_chunks_match_flat_track(self):
+        samples = read_all_samples()
+        flat = LocationTrack.from_samples(samples)
+        for chunk_size in [2, 3, 5, 1024]:
+            chunked = ChunkedLocationTrack.from_samples(samples, chunk_size=chunk_size)
+            self.assertEqual(len(chunked), len(flat))
+            self.assertSameModel(chunked, flat)
+            self.assertSameModel(ChunkedLocationTrack.from_track(flat, chunk_size=chunk_size), flat)
+            np.testing.assert_array_equal(chunked.to_track().time_utc_seconds, flat.time_utc_seconds)
+
+    def test_incremental_append(self):
+        samples = read_all_samples()
+        flat = LocationTrack.from_samples(samples)
+        chunked = ChunkedLocationTrack(chunk_size=4)
+        for sample in samples:
+            chunked = chunked.appended([sample])
+        self.assertSameModel(chunked, flat)
+
+    def test_append_shares_sealed_chunks(self):
+        samples = read_all_samples()
+        before = ChunkedLocationTrack.from_samples(samples[:12], chunk_size=4)
+        after = before.appended(samples[12:])
+        self.assertIs(after.chunks[0], before.chunks[0])
+        self.assertEqual(len(before), 11)
+        self.assertEqual(len(after), 14)
+
+    def test_estimated_positions(self):
+        chunked = ChunkedLocationTrack.from_samples(read_all_samples(), chunk_size=3)
+        lat, lon, alt = chunked.get_estimated_positions(TIMESTAMPS)
+        for i, timestamp in enumerate(TIMESTAMPS):
+            sample = chunked.get_estimated_sample(timestamp)
+            if sample is None:
+                self.assertTrue(np.isnan(lat[i]), timestamp)
+            else:
+                self.assertAlmostEqual(lat[i], sample.lat_degrees)
+                self.assertAlmostEqual(lon[i], sample.lon_degrees)
+                self.assertAlmostEqual(alt[i], sample.alt_meters)
+
+    def test_estimated_positions_many_chunks(self):
+        track = synthesize_track(LocationTrack.from_samples(read_all_samples()), 400_000, invalid_fraction=0.01,
+                                 random_seed=2)
+        chunked = ChunkedLocationTrack.from_track(track, chunk_size=64)
+        timestamps = np.linspace(track.min_timestamp - 5.0, track.max_timestamp + 5.0, len(track))
+        shuffled = np.random.default_rng(2).permutation(timestamps)
+
+        for queries in [timestamps, shuffled, shuffled.reshape(-1, 4)]:
+            started = time.perf_counter()
+            positions = chunked.get_estimated_positions(queries)
+            elapsed = time.perf_counter() - started
+            for column, expected in zip(positions, track.get_estimated_positions(queries)):
+                np.testing.assert_array_equal(column, expected)
+            # Grouping by chunk takes about 0.3 s here, testing every query against each of the
+            # 6250 chunks took over 4 s.
+            self.assertLess(elapsed, 2.0)
+
+
+class TestConcurrentIngest(unittest.TestCase):
+    def test_read_sensor(self):
+        ms = ModeledLocationSensor(max_samples=5)
+        self.assertAlmostEqual(ms.max_timestamp, 14.49)
+        ms.read_sensor(10)
+        self.assertAlmostEqual(ms.max_timestamp, 24.5)
+        self.assertIsNone(ms.get_estimated_sample(19.0))
+
+    def test_readers_see_consistent_snapshots(self):
+        samples = read_all_samples()
+        ms = ModeledLocationSensor.from_track(ChunkedLocationTrack.from_samples(samples[:2], chunk_size=2))
+        errors = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                track = ms.snapshot()
+                sample = track.get_estimated_sample(track.max_timestamp)
+                if sample is None or sample.time_utc_seconds != track.max_timestamp:
+                    errors.append(track.max_timestamp)
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        for sample in samples[2:]:
+            ms.ingest([sample])
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertAlmostEqual(ms.max_timestamp, 24.5)
+        self.assertEqual(len(ms.snapshot()), 14)
@@ -0,0 +1,100 @@
+import sys
+sys.path.append('..')
+
+import unittest
+import numpy as np
+from CompactLocationTrack import CompactLocationTrack
+from LocationReplay import synthesize_track
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+class TestCompactLocationTrack(unittest.TestCase):
+    def setUp(self):
+        self.ms = ModeledLocationSensor()
+        self.track = self.ms.snapshot().to_track()
+
+    def test_queries_match_float64(self):
+        compact = CompactLocationTrack.from_track(self.track, chunk_size=3)
+        ms = ModeledLocationSensor.from_track(compact)
+        self.assertEqual(len(compact), len(self.track))
+        # Timestamps on the samples, and away from them by more than the 0.5 microsecond time error.
+        for timestamp in list(self.track.time_utc_seconds) + list(np.arange(-2.0, 42.0, 0.125) + 0.001):
+            expected = self.ms.get_estimated_sample(timestamp)
+            sample = ms.get_estimated_sample(timestamp)
+            self.assertEqual(sample is None, expected is None, timestamp)
+            if sample is not None:
+                self.assertAlmostEqual(sample.lat_degrees, expected.lat_degrees, delta=1e-8)
+                self.assertAlmostEqual(sample.lon_degrees, expected.lon_degrees, delta=1e-8)
+                self.assertAlmostEqual(sample.alt_meters, expected.alt_meters, delta=1e-4)
+            course = ms.get_true_course_degrees(timestamp)
+            expected_course = self.ms.get_true_course_degrees(timestamp)
+            self.assertEqual(course is None, expected_course is None, timestamp)
+            if course is not None:
+                self.assertAlmostEqual(course, expected_course, delta=1e-3)
+            self.assertAlmostEqual(ms.get_nearest_sample(timestamp).time_utc_seconds,
+                                   self.ms.get_nearest_sample(timestamp).time_utc_seconds, delta=1e-6)
+
+    def test_cursor(self):
+        compact = CompactLocationTrack.from_track(self.track, chunk_size=3)
+        cursor = ModeledLocationSensor.from_track(compact).cursor()
+        # Forwards and then backwards, away from the samples by more than the time error.
+        timestamps = np.arange(-2.0, 42.0, 0.125) + 0.001
+        for timestamp in list(timestamps) + list(timestamps[::-1]):
+            expected = compact.get_estimated_sample(timestamp)
+            sample = cursor.get_estimated_sample(timestamp)
+            self.assertEqual(sample is None, expected is None, timestamp)
+            if sample is not None:
+                self.assertEqual(sample.lat_degrees, expected.lat_degrees)
+                self.assertEqual(sample.lon_degrees, expected.lon_degrees)
+            self.assertEqual(cursor.get_true_course_degrees(timestamp), compact.get_true_course_degrees(timestamp))
+            self.assertEqual(cursor.get_nearest_sample(timestamp).time_utc_seconds,
+                             compact.get_nearest_sample(timestamp).time_utc_seconds)
+
+    def test_error_bounds(self):
+        # Epoch timestamps, which only fit 32 bits as offsets from the chunk epoch.
+        track = synthesize_track(self.track, 20_000, start_time=1.7e9, jitter_seconds=0.1, noise_degrees=1e-5,
+                                 noise_meters=2.0, invalid_fraction=0.01, random_seed=7)
+        compact = CompactLocationTrack.from_track(track, chunk_size=1000)
+        decoded = compact.to_track()
+        np.testing.assert_array_equal(decoded.gap_after, track.gap_after)
+
+        # Chunks overlap by one row.
+        for chunk_index, chunk in enumerate(compact.chunks):
+            original = track.slice(chunk_index * 999, chunk_index * 999 + len(chunk))
+            rows = chunk.rows(0, None)
+            self.assertLessEqual(np.abs(rows.time_utc_seconds - original.time_utc_seconds).max(), 0.5e-6 + 1e-6 * 2.0 ** -20)
+            for column in ['lat_degrees', 'lon_degrees', 'alt_meters']:
+                values = getattr(original, column)
+                half_range = 0.5 * (values.max() - values.min())
+                self.assertLessEqual(np.abs(getattr(rows, column) - values).max(), half_range * 2.0 ** -24, column)
+
+        timestamps = np.random.default_rng(7).uniform(track.min_timestamp - 1.0, track.max_timestamp + 1.0, 5000)
+        lat, lon, alt = compact.get_estimated_positions(timestamps)
+        expected_lat, expected_lon, expected_alt = track.get_estimated_positions(timestamps)
+        np.testing.assert_array_equal(np.isnan(lat), np.isnan(expected_lat))
+        valid = ~np.isnan(lat)
+        np.testing.assert_allclose(lat[valid], expected_lat[valid], rtol=0, atol=1e-7)
+        np.testing.assert_allclose(lon[valid], expected_lon[valid], rtol=0, atol=1e-7)
+        np.testing.assert_allclose(alt[valid], expected_alt[valid], rtol=0, atol=1e-3)
+
+    def test_halves_memory(self):
+        track = synthesize_track(self.track, 100_000, random_seed=1)
+        raw = sum(column.nbytes for column in [track.time_utc_seconds, track.lat_degrees, track.lon_degrees,
+                                               track.alt_meters, track.gap_after])
+        self.assertLess(CompactLocationTrack.from_track(track).nbytes / raw, 0.55)
+
+    def test_empty_and_single_sample(self):
+        empty = CompactLocationTrack.from_track(self.track.slice(0, 0))
+        self.assertEqual(len(empty), 0)
+        self.assertIsNone(empty.get_estimated_sample(1.0))
+        self.assertIsNone(empty.get_nearest_sample(1.0))
+
+        single = CompactLocationTrack.from_track(self.track.slice(0, 1))
+        self.assertIsNone(single.get_estimated_sample(1.0))
+        self.assertIsNone(single.get_true_course_degrees(1.0))
+        self.assertEqual(single.get_nearest_sample(100.0).lat_degrees, self.track.lat_degrees[0])
+        self.assertTrue(np.isnan(single.get_estimated_positions([1.0])[0][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+sys.path.append('..')
+
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from LocationTrack import LocationTrack
+from CompressedLocationTrack import CompressedLocationTrack
+from LocationReplay import synthesize_track
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+class TestCompressedLocationTrack(unittest.TestCase):
+    def setUp(self):
+        self.ms = ModeledLocationSensor()
+        self.track = self.ms.snapshot().to_track()
+
+    def test_sensor_data_round_trips_exactly(self):
+        compressed = CompressedLocationTrack.from_track(self.track, chunk_size=4)
+        decoded = compressed.to_track()
+
+        self.assertEqual(len(compressed), len(self.track))
+        for column in ['time_utc_seconds', 'lat_degrees', 'lon_degrees', 'alt_meters', 'gap_after']:
+            np.testing.assert_array_equal(getattr(decoded, column), getattr(self.track, column))
+
+    def test_queries(self):
+        ms = ModeledLocationSensor.from_track(CompressedLocationTrack.from_track(self.track, chunk_size=3))
+        for timestamp in [1.5, 10.5, 10.75, 14.0, 18.0, 19.0, 20.0, 21.0, 24.5, 34.5]:
+            expected = self.ms.get_estimated_sample(timestamp)
+            sample = ms.get_estimated_sample(timestamp)
+            self.assertEqual(sample is None, expected is None)
+            if sample is not None:
+                self.assertEqual(sample.lat_degrees, expected.lat_degrees)
+            self.assertEqual(ms.get_true_course_degrees(timestamp), self.ms.get_true_course_degrees(timestamp))
+            self.assertEqual(ms.get_nearest_sample(timestamp).time_utc_seconds,
+                             self.ms.get_nearest_sample(timestamp).time_utc_seconds)
+
+    def test_decodes_only_touched_chunks(self):
+        compressed = CompressedLocationTrack.from_track(self.track, chunk_size=3, max_cached_chunks=2)
+
+        compressed.get_estimated_sample(12.0)
+        compressed.get_estimated_sample(12.1)
+        self.assertEqual(compressed.cached_chunk_indices(), [0])
+        compressed.get_estimated_sample(16.0)
+        compressed.get_estimated_sample(23.0)
+        self.assertEqual(compressed.cached_chunk_indices(), [2, 5])
+
+    def test_error_bounds(self):
+        track = synthesize_track(self.track, 20_000, jitter_seconds=0.1, noise_degrees=1e-5, noise_meters=2.0,
+                                 invalid_fraction=0.01, random_seed=7)
+        decoded = CompressedLocationTrack.from_track(track, chunk_size=1000).to_track()
+
+        self.assertLessEqual(np.abs(decoded.time_utc_seconds - track.time_utc_seconds).max(), 0.5e-6 + 1e-9)
+        self.assertLessEqual(np.abs(decoded.lat_degrees - track.lat_degrees).max(), 0.5e-7 + 1e-12)
+        self.assertLessEqual(np.abs(decoded.lon_degrees - track.lon_degrees).max(), 0.5e-7 + 1e-12)
+        self.assertLessEqual(np.abs(decoded.alt_meters - track.alt_meters).max(), 0.5e-3 + 1e-9)
+        np.testing.assert_array_equal(decoded.gap_after, track.gap_after)
+
+        lossless = CompressedLocationTrack.from_track(track, coordinate_ticks_per_degree=None,
+                                                      altitude_ticks_per_meter=None).to_track()
+        np.testing.assert_array_equal(lossless.lat_degrees, track.lat_degrees)
+        np.testing.assert_array_equal(lossless.alt_meters, track.alt_meters)
+
+    def test_compression_ratio(self):
+        # A long track recorded at GPS precision, like Data/sensorinput.csv.
+        track = synthesize_track(self.track, 100_000, jitter_seconds=0.02, noise_degrees=3e-7, random_seed=1)
+        track = LocationTrack(np.round(track.time_utc_seconds, 2), np.round(track.lat_degrees, 6),
+                              np.round(track.lon_degrees, 6), track.alt_meters, track.gap_after)
+        raw = sum(column.nbytes for column in [track.time_utc_seconds, track.lat_degrees, track.lon_degrees,
+                                               track.alt_meters, track.gap_after])
+        self.assertGreater(raw / CompressedLocationTrack.from_track(track).nbytes, 5.0)
+
+    def test_estimated_positions_many_chunks(self):
+        track = synthesize_track(self.track, 400_000, invalid_fraction=0.01, random_seed=3)
+        compressed = CompressedLocationTrack.from_track(track, chunk_size=64, max_cached_chunks=10_000)
+        timestamps = np.linspace(track.min_timestamp - 5.0, track.max_timestamp + 5.0, len(track))
+        decoded = compressed.to_track()
+        expected = decoded.get_estimated_positions(timestamps)
+        compressed.get_estimated_positions(timestamps)
+
+        # With every chunk cached, grouping by chunk takes about 0.4 s here, testing every query
+        # against each of the 6250 chunks took over 4 s.
+        started = time.perf_counter()
+        positions = compressed.get_estimated_positions(timestamps)
+        self.assertLess(time.perf_counter() - started, 2.0)
+        for column, expected_column in zip(positions, expected):
+            np.testing.assert_allclose(column, expected_column, rtol=0, atol=1e-12)
+
+    def test_save_and_load(self):
+        compressed = CompressedLocationTrack.from_track(self.track, chunk_size=4, altitude_ticks_per_meter=None)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'track.npz')
+            compressed.save(path)
+            loaded = CompressedLocationTrack.load(path)
+
+        self.assertEqual(loaded.chunks, compressed.chunks)
+        self.assertIsNone(loaded.altitude_ticks_per_meter)
+        np.testing.assert_array_equal(loaded.to_track().lon_degrees, self.track.lon_degrees)
@@ -0,0 +1,87 @@
+import sys
+sys.path.append('..')
+
+import unittest
+import numpy as np
+from DistanceIndex import DistanceIndex
+from LocationReplay import synthesize_track
+from LocationSensor import LocationSample
+from LocationTrack import LocationTrack
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+class TestDistanceIndex(unittest.TestCase):
+    def setUp(self):
+        # Segments of length 1, 2 and 2 degrees, the middle one across an invalid reading.
+        self.samples = [LocationSample(0.0, 0.0, 0.0, 0.0), LocationSample(1.0, 0.0, 0.0, 1.0), None,
+                        LocationSample(1.0, 2.0, 0.0, 3.0), LocationSample(1.0, 4.0, 0.0, 5.0)]
+        self.track = LocationTrack.from_samples(self.samples)
+
+    def test_total_distance(self):
+        track = synthesize_track(ModeledLocationSensor().snapshot(), 2000, noise_degrees=1e-5, random_seed=3)
+        index = DistanceIndex.from_track(track, bridge_gaps=True)
+        expected = np.hypot(np.diff(track.lat_degrees), np.diff(track.lon_degrees)).sum()
+        self.assertAlmostEqual(index.distance_between(track.min_timestamp, track.max_timestamp), expected, places=9)
+        self.assertEqual(len(index), len(track))
+
+    def test_partial_segments(self):
+        index = DistanceIndex.from_track(self.track)
+        self.assertAlmostEqual(index.distance_between(0.25, 0.75), 0.5)
+        self.assertAlmostEqual(index.distance_between(0.5, 4.0), 0.5 + 1.0)
+        self.assertAlmostEqual(index.distance_between(4.0, 0.5), -1.5)
+        # Past the last sample the last segment is extrapolated, as in get_estimated_sample.
+        self.assertAlmostEqual(index.distance_between(5.0, 6.0), 1.0)
+
+    def test_gaps(self):
+        excluded = DistanceIndex.from_track(self.track)
+        bridged = DistanceIndex.from_track(self.track, bridge_gaps=True)
+        self.assertAlmostEqual(excluded.distance_between(0.0, 5.0), 3.0)
+        self.assertAlmostEqual(bridged.distance_between(0.0, 5.0), 5.0)
+        self.assertAlmostEqual(excluded.distance_between(1.5, 2.5), 0.0)
+        self.assertAlmostEqual(excluded.covered_duration_between(0.0, 5.0), 3.0)
+        self.assertAlmostEqual(bridged.covered_duration_between(0.0, 5.0), 5.0)
+
+    def test_geodesic(self):
+        track = LocationTrack.from_samples([LocationSample(0.0, 0.0, 0.0, 0.0), LocationSample(1.0, 0.0, 0.0, 1.0)])
+        index = DistanceIndex.from_track(track, geodesic=True)
+        # One degree of latitude is about 111.2 km.
+        self.assertAlmostEqual(index.distance_between(0.0, 1.0), 111195.08, places=1)
+
+    def test_incremental_matches_batch(self):
+        samples = self.samples + [LocationSample(2.0, 5.0, 0.0, 6.0), None, None, LocationSample(3.0, 5.0, 0.0, 8.0)]
+        batch = DistanceIndex.from_track(LocationTrack.from_samples(samples))
+        incremental = DistanceIndex()
+        for start in range(0, len(samples), 2):
+            incremental.extend_samples(samples[start:start + 2])
+        timestamps = np.linspace(-1.0, 9.0, 41)
+        np.testing.assert_allclose(incremental.distances_at(timestamps), batch.distances_at(timestamps))
+        self.assertEqual(len(incremental), len(batch))
+
+    def test_vectorized(self):
+        track = synthesize_track(ModeledLocationSensor().snapshot(), 500, invalid_fraction=0.1, random_seed=7)
+        index = DistanceIndex.from_track(track)
+        rng = np.random.default_rng(7)
+        starts = rng.uniform(track.min_timestamp, track.max_timestamp, 50)
+        ends = rng.uniform(track.min_timestamp, track.max_timestamp, 50)
+        expected = [index.distance_between(start, end) for start, end in zip(starts, ends)]
+        np.testing.assert_allclose(index.distances_between(starts, ends), expected)
+
+    def test_empty(self):
+        index = DistanceIndex()
+        self.assertEqual(index.distance_between(0.0, 10.0), 0.0)
+        index.extend_samples([None, LocationSample(0.0, 0.0, 0.0, 0.0)])
+        self.assertEqual(index.distance_between(0.0, 10.0), 0.0)
+
+    def test_modeled_sensor_keeps_index_current(self):
+        ms = ModeledLocationSensor()
+        index = ms.distance_index()
+        self.assertIs(ms.distance_index(), index)
+        last = ms.snapshot().to_track().sample(len(ms.snapshot()) - 1)
+        ms.ingest([LocationSample(last.lat_degrees + 0.001, last.lon_degrees, last.alt_meters,
+                                  last.time_utc_seconds + 1.0)])
+        self.assertEqual(len(index), len(ms.snapshot()))
+        self.assertAlmostEqual(index.distance_between(last.time_utc_seconds, last.time_utc_seconds + 1.0), 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
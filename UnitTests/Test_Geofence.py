@@ -0,0 +1,119 @@
+import sys
+sys.path.append('..')
+
+import unittest
+import numpy as np
+from LocationSensor import LocationSensor
+from Geofence import CircleFence, PolygonFence, GeofenceEngine, ENTER, EXIT
+from LocationReplay import TrackReplay, synthesize_track
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+def square(fence_id, lat, lon, half_size):
+    return PolygonFence(fence_id, [(lat - half_size, lon - half_size), (lat - half_size, lon + half_size),
+                                   (lat + half_size, lon + half_size), (lat + half_size, lon - half_size)])
+
+
+class TestFences(unittest.TestCase):
+    def test_circle(self):
+        fence = CircleFence('c', 0.0, 0.0, 1.0)
+        self.assertTrue(fence.contains(0.5, 0.5))
+        self.assertFalse(fence.contains(1.0, 0.5))
+        np.testing.assert_allclose(fence.crossing_fractions(-2.0, 0.0, 2.0, 0.0), [0.25, 0.75])
+        self.assertEqual(len(fence.crossing_fractions(-2.0, 2.0, 2.0, 2.0)), 0)
+
+    def test_polygon(self):
+        fence = PolygonFence('p', [(0.0, 0.0), (0.0, 2.0), (1.0, 1.0), (2.0, 2.0), (2.0, 0.0)])
+        self.assertTrue(fence.contains(0.5, 1.0))
+        self.assertFalse(fence.contains(1.0, 1.5))
+        np.testing.assert_allclose(sorted(fence.crossing_fractions(0.5, -1.0, 0.5, 3.0)), [0.25, 0.625])
+
+
+class TestGeofenceEngine(unittest.TestCase):
+    def setUp(self):
+        self.ms = ModeledLocationSensor()
+
+    def test_crossing_times(self):
+        # The sensor is at 41.188935, -112.019638 at 11.51 and 41.189714, -112.018559 at 12.52.
+        fence = PolygonFence('box', [(41.0, -112.019), (41.0, -112.0), (41.5, -112.0), (41.5, -112.019)])
+        events = GeofenceEngine([fence]).evaluate_track(self.ms.snapshot())
+
+        self.assertEqual([event.kind for event in events], [ENTER])
+        expected_time = 11.51 + (1.01 * (-112.019 + 112.019638) / (-112.018559 + 112.019638))
+        self.assertAlmostEqual(events[0].time_utc_seconds, expected_time)
+        self.assertAlmostEqual(events[0].lon_degrees, -112.019)
+        self.assertAlmostEqual(self.ms.get_estimated_sample(events[0].time_utc_seconds).lon_degrees, -112.019)
+
+    def test_enter_and_exit(self):
+        fence = CircleFence('circle', 41.194849, -112.011853, 0.002)
+        events = GeofenceEngine([fence]).evaluate_track(self.ms.snapshot())
+
+        self.assertEqual([event.kind for event in events], [ENTER, EXIT])
+        for event in events:
+            sample = self.ms.get_estimated_sample(event.time_utc_seconds)
+            distance = np.hypot(sample.lat_degrees - 41.194849, sample.lon_degrees + 112.011853)
+            self.assertAlmostEqual(distance, 0.002)
+
+    def test_initial_containment_and_gaps(self):
+        # The invalid reading between 18.52 and 20.49 hides any crossing of this fence, so the exit
+        # is reported at the next valid sample.
+        fence = CircleFence('start', 41.192, -112.015, 0.009)
+        engine = GeofenceEngine([fence])
+        events = engine.evaluate_track(self.ms.snapshot())
+
+        self.assertEqual([(event.kind, event.time_utc_seconds) for event in events], [(ENTER, 10.5), (EXIT, 20.49)])
+        self.assertEqual(engine.inside_fence_ids, [])
+
+    def test_incremental_matches_batch(self):
+        track = synthesize_track(self.ms.snapshot(), 2000, noise_degrees=2e-5, invalid_fraction=0.01, random_seed=5)
+        rng = np.random.default_rng(6)
+        centers = rng.integers(0, len(track), 400)
+        fences = [CircleFence(i, track.lat_degrees[center], track.lon_degrees[center], rng.uniform(0.0005, 0.005))
+                  for i, center in enumerate(centers[:200])]
+        fences += [square(i, track.lat_degrees[center], track.lon_degrees[center], 0.002)
+                   for i, center in enumerate(centers[200:], start=200)]
+
+        batch_events = GeofenceEngine(fences).evaluate_track(track)
+        engine = GeofenceEngine(fences)
+        replay = TrackReplay(track, speed=None, batch_size=37)
+        incremental_events = []
+        replay.subscribe(lambda batch: incremental_events.extend(engine.process(batch)))
+        replay.run()
+
+        self.assertGreater(len(batch_events), 100)
+        self.assertEqual([(event.fence_id, event.kind, event.time_utc_seconds) for event in batch_events],
+                         [(event.fence_id, event.kind, event.time_utc_seconds) for event in incremental_events])
+
+        # Without the spatial index, every fence is tested against every segment.
+        brute_force = GeofenceEngine(fences, cell_size_degrees=1e3).evaluate_track(track)
+        self.assertEqual(len(brute_force), len(batch_events))
+
+    def test_oversized_fences(self):
+        track = synthesize_track(self.ms.snapshot(), 2000, noise_degrees=2e-5, random_seed=8)
+        rng = np.random.default_rng(8)
+        fences = [CircleFence(i, track.lat_degrees[center], track.lon_degrees[center], 0.001)
+                  for i, center in enumerate(rng.integers(0, len(track), 300))]
+        # Covering a small part of the track, and all of it.
+        fences.append(CircleFence('large', track.lat_degrees[100], track.lon_degrees[100], 0.05))
+        fences.append(square('huge', float(np.median(track.lat_degrees)), float(np.median(track.lon_degrees)), 10.0))
+
+        engine = GeofenceEngine(fences)
+        self.assertEqual([engine.fences[index].fence_id for index in engine.oversized], ['large', 'huge'])
+        self.assertLess(len(engine.grid), 2000)
+        events = engine.evaluate_track(track)
+        self.assertIn('huge', engine.inside_fence_ids)
+        self.assertTrue(any(event.fence_id == 'large' for event in events))
+
+        brute_force = GeofenceEngine(fences, cell_size_degrees=1e3).evaluate_track(track)
+        # Events at the same time may come out in either order.
+        self.assertEqual(sorted((event.time_utc_seconds, str(event.fence_id), event.kind) for event in events),
+                         sorted((event.time_utc_seconds, str(event.fence_id), event.kind) for event in brute_force))
+
+    def test_process_samples(self):
+        fence = CircleFence('circle', 41.194849, -112.011853, 0.002)
+        engine = GeofenceEngine([fence])
+        ls = LocationSensor()
+        events = []
+        for _ in range(15):
+            events += engine.process_samples([ls.read_location()])
+        self.assertEqual([event.kind for event in events], [ENTER, EXIT])
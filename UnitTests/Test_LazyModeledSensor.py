@@ -0,0 +1,92 @@
+import sys
+sys.path.append('..')
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from ModeledLocationSensor import ModeledLocationSensor
+from TrackCache import cache_path
+
+
+class TestLazyModeledSensor(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+        self.sensor_path = os.path.join(self.directory.name, 'sensorinput.csv')
+        shutil.copy('Data/sensorinput.csv', self.sensor_path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_import_does_not_load_numpy(self):
+        result = subprocess.run([sys.executable, '-c', 'import sys, ModeledLocationSensor; print("numpy" in sys.modules)'],
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_lazy_defers_reading(self):
+        ms = ModeledLocationSensor(sensor_read_path=self.sensor_path, lazy=True)
+        self.assertIsNone(ms.sensor)
+
+        sample = ms.get_nearest_sample(23.0)
+        self.assertIsNotNone(ms.sensor)
+        self.assertAlmostEqual(sample.lat_degrees, 41.202207)
+        self.assertIsNone(ms.get_estimated_sample(19.0))
+        self.assertAlmostEqual(ms.get_true_course_degrees(14.0), -81.30873495286335, delta=1e-5)
+
+    def test_cache_round_trip(self):
+        ms = ModeledLocationSensor(sensor_read_path=self.sensor_path, cache_dir=self.cache_dir)
+        self.assertTrue(os.path.exists(cache_path(self.cache_dir, self.sensor_path, 15)))
+
+        cached = ModeledLocationSensor(sensor_read_path=self.sensor_path, lazy=True, cache_dir=self.cache_dir)
+        for timestamp in [1.5, 10.75, 14.0, 19.0, 34.5]:
+            expected = ms.get_estimated_sample(timestamp)
+            sample = cached.get_estimated_sample(timestamp)
+            self.assertEqual(sample is None, expected is None)
+            if sample is not None:
+                self.assertEqual(sample.lat_degrees, expected.lat_degrees)
+        # Served entirely from the cache, the sensor file is never opened.
+        self.assertIsNone(cached.sensor)
+
+    def test_read_sensor_after_cache(self):
+        ModeledLocationSensor(max_samples=5, sensor_read_path=self.sensor_path, cache_dir=self.cache_dir)
+        ms = ModeledLocationSensor(max_samples=5, sensor_read_path=self.sensor_path, cache_dir=self.cache_dir)
+        self.assertIsNone(ms.sensor)
+
+        ms.read_sensor(10)
+        self.assertAlmostEqual(ms.max_timestamp, 24.5)
+        self.assertEqual(len(ms.snapshot()), 14)
+
+    def test_cache_invalidated_by_changes(self):
+        ModeledLocationSensor(sensor_read_path=self.sensor_path, cache_dir=self.cache_dir)
+
+        # Touching the file keeps the entry, since its content hash still matches.
+        stat = os.stat(self.sensor_path)
+        os.utime(self.sensor_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        ms = ModeledLocationSensor(sensor_read_path=self.sensor_path, cache_dir=self.cache_dir)
+        self.assertIsNone(ms.sensor)
+
+        with open(self.sensor_path) as file:
+            rows = file.read()
+        with open(self.sensor_path, 'w') as file:
+            file.write(rows.replace('41.188007', '41.188008'))
+        ms = ModeledLocationSensor(sensor_read_path=self.sensor_path, cache_dir=self.cache_dir)
+        self.assertIsNotNone(ms.sensor)
+        self.assertAlmostEqual(ms.get_nearest_sample(10.5).lat_degrees, 41.188008)
+
+    def test_corrupt_cache_entry_is_a_miss(self):
+        ModeledLocationSensor(sensor_read_path=self.sensor_path, cache_dir=self.cache_dir)
+        path = cache_path(self.cache_dir, self.sensor_path, 15)
+        with open(path, 'rb') as file:
+            contents = file.read()
+        for corrupt in [contents[:len(contents) // 2], b'', b'not a zip file']:
+            with open(path, 'wb') as file:
+                file.write(corrupt)
+            ms = ModeledLocationSensor(sensor_read_path=self.sensor_path, cache_dir=self.cache_dir)
+            self.assertIsNotNone(ms.sensor)
+            self.assertAlmostEqual(ms.get_nearest_sample(23.0).lat_degrees, 41.202207)
+
+        # The re-parse rewrote a good entry, without leaving temporary files behind.
+        self.assertIsNone(ModeledLocationSensor(sensor_read_path=self.sensor_path, cache_dir=self.cache_dir).sensor)
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(path)])
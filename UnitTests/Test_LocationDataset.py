@@ -0,0 +1,153 @@
+import sys
+sys.path.append('..')
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import LocationDataset as location_dataset
+from LocationDataset import LocationDataset, CATALOG_FILENAME
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+def write_rotated_logs(directory: str, rows_per_file: int = 5) -> list[str]:
+    """Splits Data/sensorinput.csv into several rotated log files."""
+    with open('Data/sensorinput.csv') as file:
+        rows = file.readlines()
+    paths = []
+    for i in range(0, len(rows), rows_per_file):
+        path = os.path.join(directory, f'sensor.{i // rows_per_file:03d}.csv')
+        with open(path, 'w') as file:
+            file.writelines(rows[i:i + rows_per_file])
+        paths.append(path)
+    return paths
+
+
+class TestLocationDataset(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = write_rotated_logs(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_catalog(self):
+        ds = LocationDataset(self.directory.name)
+
+        self.assertEqual(len(ds.segments), 3)
+        self.assertEqual(ds.row_count, 15)
+        self.assertAlmostEqual(ds.min_timestamp, 10.5)
+        self.assertAlmostEqual(ds.max_timestamp, 24.5)
+        self.assertAlmostEqual(ds.segments[1].min_time, 15.47)
+        self.assertAlmostEqual(ds.segments[1].max_time, 19.50)
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, CATALOG_FILENAME)))
+        self.assertEqual(ds.loaded_segment_paths(), [])
+
+    def test_glob_source(self):
+        ds = LocationDataset(os.path.join(self.directory.name, 'sensor.00[01].csv'))
+        self.assertEqual(len(ds.segments), 2)
+
+    def test_glob_subset_keeps_catalog(self):
+        LocationDataset(self.directory.name)
+        LocationDataset(os.path.join(self.directory.name, 'sensor.000.csv'))
+
+        with mock.patch.object(location_dataset, 'scan_track_file', wraps=location_dataset.scan_track_file) as scan:
+            ds = LocationDataset(self.directory.name)
+        self.assertEqual(len(ds.segments), 3)
+        scan.assert_not_called()
+
+    def test_catalog_prunes_deleted_files(self):
+        LocationDataset(self.directory.name)
+        os.remove(self.paths[-1])
+        self.assertEqual(len(LocationDataset(self.directory.name).segments), 2)
+        with open(os.path.join(self.directory.name, CATALOG_FILENAME)) as file:
+            self.assertEqual(len(json.load(file)['segments']), 2)
+        self.assertEqual(sorted(os.listdir(self.directory.name)),
+                         sorted([CATALOG_FILENAME] + [os.path.basename(path) for path in self.paths[:-1]]))
+
+    def test_segments_for_window_matches_scan(self):
+        # Overlapping files, plus a file covering most of the others.
+        with open('Data/sensorinput.csv') as file:
+            rows = file.readlines()
+        for name, selected in [('overlap.a.csv', rows[2:7]), ('overlap.b.csv', rows[0:1] + rows[13:])]:
+            with open(os.path.join(self.directory.name, name), 'w') as file:
+                file.writelines(selected)
+        ds = LocationDataset(self.directory.name)
+
+        for start_time in [0.0, 10.5, 12.0, 15.0, 18.9, 19.2, 22.0, 24.5, 30.0]:
+            for end_time in [start_time, start_time + 0.5, start_time + 4.0]:
+                overlapping = [i for i, segment in enumerate(ds.segments)
+                               if segment.max_time >= start_time and segment.min_time <= end_time]
+                if overlapping:
+                    first, last = overlapping[0], overlapping[-1]
+                else:
+                    first = sum(segment.min_time <= start_time for segment in ds.segments)
+                    last = first - 1
+                if first > 0 and (first == len(ds.segments) or ds.segments[first].min_time > start_time):
+                    first -= 1
+                if last < len(ds.segments) - 1 and (last < 0 or ds.segments[last].max_time < end_time):
+                    last += 1
+                self.assertEqual(ds.segments_for_window(start_time, end_time), ds.segments[max(first, 0):last + 1],
+                                 (start_time, end_time))
+
+    def test_catalog_rescans_modified_file(self):
+        LocationDataset(self.directory.name)
+        with open(self.paths[-1], 'a') as file:
+            file.write('41.205, -111.998, 4200, 25.50\n')
+
+        ds = LocationDataset(self.directory.name)
+        self.assertAlmostEqual(ds.max_timestamp, 25.5)
+        self.assertEqual(ds.row_count, 16)
+
+    def test_loads_only_needed_segments(self):
+        ds = LocationDataset(self.directory.name)
+        ds.get_estimated_sample(12.0)
+        self.assertEqual(ds.loaded_segment_paths(), [self.paths[0]])
+
+        # Interpolating across a file rotation needs both neighbouring files.
+        ds.get_estimated_sample(15.0)
+        self.assertEqual(sorted(ds.loaded_segment_paths()), self.paths[:2])
+
+    def test_lru_eviction(self):
+        ds = LocationDataset(self.directory.name, max_loaded_segments=1)
+        ds.get_estimated_sample(12.0)
+        ds.get_estimated_sample(23.0)
+        self.assertEqual(ds.loaded_segment_paths(), [self.paths[2]])
+
+    def test_queries_match_single_file(self):
+        ms = ModeledLocationSensor()
+        # Nine rows per file rotates right at an invalid reading, fourteen leaves a single row in
+        # the last file and one puts every row in its own file.
+        for rows_per_file in [1, 5, 9, 14]:
+            with tempfile.TemporaryDirectory() as directory:
+                write_rotated_logs(directory, rows_per_file)
+                ds = LocationDataset(directory)
+                for timestamp in [1.5, 10.5, 10.75, 14.0, 15.0, 19.0, 19.5, 20.0, 21.0, 24.0, 24.5, 30.0, 34.5]:
+                    self.assertQueriesMatch(ds, ms, timestamp, rows_per_file)
+
+    def assertQueriesMatch(self, ds, ms, timestamp, rows_per_file):
+        message = (rows_per_file, timestamp)
+        expected = ms.get_estimated_sample(timestamp)
+        sample = ds.get_estimated_sample(timestamp)
+        if expected is None:
+            self.assertIsNone(sample, message)
+        else:
+            self.assertAlmostEqual(sample.lat_degrees, expected.lat_degrees, msg=message)
+            self.assertAlmostEqual(sample.lon_degrees, expected.lon_degrees, msg=message)
+            self.assertAlmostEqual(sample.alt_meters, expected.alt_meters, msg=message)
+        expected_course = ms.get_true_course_degrees(timestamp)
+        course = ds.get_true_course_degrees(timestamp)
+        if expected_course is None:
+            self.assertIsNone(course, message)
+        else:
+            self.assertAlmostEqual(course, expected_course, msg=message)
+
+    def test_window_model(self):
+        ds = LocationDataset(self.directory.name)
+        ms = ModeledLocationSensor.from_track(ds.load_window(14.0, 16.0))
+
+        sample = ms.get_nearest_sample(15.0)
+        self.assertAlmostEqual(sample.time_utc_seconds, 15.47)
+        self.assertAlmostEqual(ms.min_timestamp, 10.5)
+        self.assertAlmostEqual(ms.max_timestamp, 18.52)
@@ -0,0 +1,69 @@
+import sys
+sys.path.append('..')
+
+import os
+import tempfile
+import unittest
+from LocationSensor import LocationSample, LocationSensor
+from LocationFusion import fuse_sensors, fuse_streams, sensor_stream
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+def shifted(samples, time_offset=0.0, lat_offset=0.0):
+    return [None if sample is None else
+            LocationSample(sample.lat_degrees + lat_offset, sample.lon_degrees, sample.alt_meters,
+                           sample.time_utc_seconds + time_offset) for sample in samples]
+
+
+class TestLocationFusion(unittest.TestCase):
+    def setUp(self):
+        self.samples = list(sensor_stream(LocationSensor(), 15))
+
+    def test_identical_sensors(self):
+        track = fuse_sensors([LocationSensor(), LocationSensor()])
+        fused = ModeledLocationSensor.from_track(track)
+        single = ModeledLocationSensor()
+
+        self.assertEqual(len(track), 14)
+        for timestamp in [1.5, 10.75, 14.0, 21.0, 34.5]:
+            self.assertAlmostEqual(fused.get_estimated_sample(timestamp).lat_degrees,
+                                   single.get_estimated_sample(timestamp).lat_degrees)
+            self.assertAlmostEqual(fused.get_true_course_degrees(timestamp), single.get_true_course_degrees(timestamp))
+        self.assertIsNone(fused.get_estimated_sample(19.0))
+        self.assertIsNone(fused.get_true_course_degrees(20.0))
+
+    def test_fills_invalid_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'backup.csv')
+            with open('Data/sensorinput.csv') as file:
+                rows = file.read().replace('-, -, -, 19.50', '41.197000, -112.009000, 4200, 19.50')
+            with open(path, 'w') as file:
+                file.write(rows)
+            fused = ModeledLocationSensor.from_track(fuse_sensors([LocationSensor(), LocationSensor(path)]))
+
+        sample = fused.get_estimated_sample(19.5)
+        self.assertAlmostEqual(sample.lat_degrees, 41.197)
+        self.assertIsNotNone(fused.get_estimated_sample(19.0))
+        self.assertIsNotNone(fused.get_true_course_degrees(20.0))
+
+    def test_interleaved_streams(self):
+        track = fuse_streams([self.samples, shifted(self.samples, time_offset=0.5)])
+        self.assertEqual(len(track), 28)
+        self.assertTrue(all(track.time_utc_seconds[1:] >= track.time_utc_seconds[:-1]))
+
+        # Both streams read an invalid sample around 19.5, so only the stretch between them stays a gap.
+        fused = ModeledLocationSensor.from_track(track)
+        self.assertIsNone(fused.get_estimated_sample(19.5))
+        self.assertIsNotNone(fused.get_estimated_sample(18.7))
+
+    def test_weights(self):
+        track = fuse_streams([self.samples, shifted(self.samples, lat_offset=0.003)], weights=[2.0, 1.0])
+        self.assertAlmostEqual(track.lat_degrees[0], 41.188007 + 0.001)
+
+    def test_voting(self):
+        streams = [self.samples, shifted(self.samples, lat_offset=1e-6), shifted(self.samples, lat_offset=0.5)]
+        track = fuse_streams(streams, max_disagreement_degrees=0.01)
+        self.assertAlmostEqual(track.lat_degrees[0], 41.188007, delta=1e-6)
+
+        track = fuse_streams(streams)
+        self.assertAlmostEqual(track.lat_degrees[0], 41.188007 + 0.5 / 3, delta=1e-6)
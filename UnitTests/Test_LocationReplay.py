@@ -0,0 +1,96 @@
+import sys
+sys.path.append('..')
+
+import unittest
+import numpy as np
+from LocationTrack import LocationTrack
+from LocationReplay import TrackReplay, synthesize_track
+from ModeledLocationSensor import ModeledLocationSensor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTrackReplay(unittest.TestCase):
+    def setUp(self):
+        self.ms = ModeledLocationSensor()
+
+    def test_fan_out(self):
+        replay = TrackReplay(self.ms, speed=None, batch_size=4)
+        received = [[], []]
+        replay.subscribe(received[0].append)
+        replay.subscribe(received[1].append)
+
+        self.assertEqual(replay.run(), 14)
+        self.assertEqual([len(batch) for batch in received[0]], [4, 4, 4, 2])
+        self.assertIs(received[0][0], received[1][0])
+        times = np.concatenate([batch.time_utc_seconds for batch in received[0]])
+        np.testing.assert_array_equal(times, self.ms.snapshot().to_track().time_utc_seconds)
+
+    def test_real_time_pacing(self):
+        clock = FakeClock()
+        replay = TrackReplay(self.ms, speed=2.0, clock=clock, sleep=clock.sleep)
+        arrivals = []
+        replay.subscribe(lambda batch: arrivals.append((clock.now, len(batch))))
+        replay.run()
+
+        # 14 seconds of track replayed at double speed, one sample coming due at a time.
+        self.assertAlmostEqual(clock.now, (24.5 - 10.5) / 2.0)
+        self.assertEqual(sum(count for _, count in arrivals), 14)
+        self.assertAlmostEqual(arrivals[1][0], (11.51 - 10.5) / 2.0)
+
+    def test_resampled_replay(self):
+        replay = TrackReplay(self.ms, speed=None, batch_size=5, resample_period_seconds=0.5)
+        batches = []
+        replay.subscribe(batches.append)
+        replay.run()
+
+        track = LocationTrack.concatenate(batches)
+        self.assertEqual(len(replay), 29)
+        self.assertAlmostEqual(track.time_utc_seconds[1], 11.0)
+        # 19.0 and 19.5 fall into the invalid reading, and the row before them is flagged.
+        self.assertNotIn(19.0, track.time_utc_seconds)
+        self.assertTrue(track.gap_after[list(track.time_utc_seconds).index(18.5)])
+        self.assertIsNone(ModeledLocationSensor.from_track(track).get_estimated_sample(19.0))
+
+    def test_stop(self):
+        clock = FakeClock()
+        replay = TrackReplay(self.ms, speed=1.0, clock=clock, sleep=lambda seconds: replay.stop())
+        self.assertEqual(replay.run(), 1)
+
+
+class TestSynthesizeTrack(unittest.TestCase):
+    def test_synthesize(self):
+        seed = ModeledLocationSensor().snapshot()
+        track = synthesize_track(seed, 100_000, jitter_seconds=0.1, noise_degrees=1e-6,
+                                 invalid_fraction=0.01, random_seed=3)
+
+        self.assertEqual(len(track), 100_000)
+        self.assertAlmostEqual(track.min_timestamp, 10.5)
+        self.assertTrue(np.all(np.diff(track.time_utc_seconds) > 0))
+        self.assertAlmostEqual(np.mean(np.diff(track.time_utc_seconds)), 1.0, delta=0.02)
+        self.assertAlmostEqual(track.gap_after.mean(), 0.01, delta=0.002)
+
+        # Without noise the track moves in exactly the seed's directions.
+        clean = ModeledLocationSensor.from_track(synthesize_track(seed, 14, period_seconds=0.5))
+        self.assertAlmostEqual(clean.get_true_course_degrees(10.7), seed.get_true_course_degrees(10.7))
+        self.assertAlmostEqual(clean.get_true_course_degrees(12.2), seed.get_true_course_degrees(14.0))
+
+    def test_large_fan_out(self):
+        track = synthesize_track(ModeledLocationSensor().snapshot(), 1_000_000, random_seed=1)
+        replay = TrackReplay(track, speed=None, batch_size=65536)
+        counts = [0] * 4
+        for i in range(4):
+            replay.subscribe(lambda batch, i=i: counts.__setitem__(i, counts[i] + len(batch)))
+        self.assertEqual(replay.run(), 1_000_000)
+        self.assertEqual(counts, [1_000_000] * 4)
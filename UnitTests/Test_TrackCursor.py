@@ -0,0 +1,75 @@
+import sys
+sys.path.append('..')
+
+import unittest
+import numpy as np
+from ChunkedLocationTrack import ChunkedLocationTrack
+from CompressedLocationTrack import CompressedLocationTrack
+from LocationReplay import synthesize_track
+from ModeledLocationSensor import ModeledLocationSensor
+from TrackCursor import TrackCursor, _gallop
+
+
+class TestTrackCursor(unittest.TestCase):
+    def assertSameQueries(self, cursor, ms, timestamps):
+        for timestamp in timestamps:
+            expected = ms.get_estimated_sample(timestamp)
+            sample = cursor.get_estimated_sample(timestamp)
+            if expected is None:
+                self.assertIsNone(sample, timestamp)
+            else:
+                self.assertEqual(sample.lat_degrees, expected.lat_degrees, timestamp)
+                self.assertEqual(sample.lon_degrees, expected.lon_degrees, timestamp)
+            self.assertEqual(cursor.get_true_course_degrees(timestamp), ms.get_true_course_degrees(timestamp))
+            self.assertEqual(cursor.get_nearest_sample(timestamp).time_utc_seconds,
+                             ms.get_nearest_sample(timestamp).time_utc_seconds)
+
+    def test_sequential_playback(self):
+        ms = ModeledLocationSensor()
+        self.assertSameQueries(ms.cursor(), ms, np.arange(0.0, 40.0, 0.05))
+
+    def test_backward_jumps(self):
+        ms = ModeledLocationSensor()
+        timestamps = np.random.default_rng(4).uniform(0.0, 40.0, 500)
+        self.assertSameQueries(ms.cursor(), ms, list(timestamps) + [10.5, 24.5, 19.0, 20.0, 18.52])
+
+    def test_chunked_track(self):
+        ms = ModeledLocationSensor.from_track(ChunkedLocationTrack.from_track(ModeledLocationSensor().snapshot().to_track(),
+                                                                              chunk_size=3))
+        cursor = ms.cursor()
+        self.assertSameQueries(cursor, ms, np.arange(0.0, 40.0, 0.25))
+        self.assertSameQueries(cursor, ms, np.arange(40.0, 0.0, -0.25))
+
+    def test_compressed_track(self):
+        track = ModeledLocationSensor().snapshot().to_track()
+        compressed = CompressedLocationTrack.from_track(track, chunk_size=3, max_cached_chunks=2)
+        ms = ModeledLocationSensor.from_track(compressed)
+        cursor = ms.cursor()
+        self.assertSameQueries(cursor, ModeledLocationSensor(), np.arange(0.0, 40.0, 0.25))
+        # A sequential sweep decodes each chunk once, through the track's own chunk cache.
+        self.assertLessEqual(len(compressed.cached_chunk_indices()), 2)
+
+    def test_rejects_unsupported_sources(self):
+        with self.assertRaises(TypeError):
+            TrackCursor([1.0, 2.0])
+
+    def test_follows_ingest(self):
+        ms = ModeledLocationSensor(max_samples=5)
+        cursor = ms.cursor()
+        self.assertAlmostEqual(cursor.get_estimated_sample(14.49).lat_degrees, 41.191607)
+        ms.read_sensor(10)
+        self.assertAlmostEqual(cursor.get_nearest_sample(23.0).lat_degrees, 41.202207)
+
+    def test_iter_estimated_samples(self):
+        ms = ModeledLocationSensor()
+        samples = list(TrackCursor(ms).iter_estimated_samples([18.0, 19.0, 21.0]))
+        self.assertIsNotNone(samples[0])
+        self.assertIsNone(samples[1])
+        self.assertIsNotNone(samples[2])
+
+    def test_gallop(self):
+        times = synthesize_track(ModeledLocationSensor().snapshot(), 1000).time_utc_seconds
+        for start in [0, 1, 10, 500, 998]:
+            for timestamp in [times[0] - 1.0, times[0], times[3] + 0.1, times[700], times[-1], times[-1] + 5.0]:
+                expected = min(max(int(np.searchsorted(times, timestamp, side='right')) - 1, 0), len(times) - 2)
+                self.assertEqual(_gallop(times, timestamp, start), expected)